@@ -0,0 +1,316 @@
+from __future__ import annotations
+from typing import Optional, Iterable, Iterator, AsyncIterator
+from collections import deque
+from functools import partial
+import asyncio
+import traceback
+from concurrent.futures import Executor, ProcessPoolExecutor
+
+from ooxml_docx.docx import OoxmlDocx
+
+from abstract_docx.normalization import TemplateCache
+from abstract_docx.main import AbstractDocx, PipelineStage, OnStage
+from abstract_docx.batch import (
+	ReadManyResult, ReadManyResultMode, _SERIALIZATION_STAGE, _read_in_process, _pack, _unpack
+)
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+# Template cache of the current worker process, when offloading to a process executor
+_worker_template_cache: Optional[TemplateCache] = None
+
+
+def _read_in_worker_process(
+	content: bytes,
+	file_path: str,
+	result_mode: ReadManyResultMode,
+	use_template_cache: bool,
+	template_cache_directory: Optional[str],
+	logging_level: str,
+	isolate_errors: bool = True
+) -> ReadManyResult | bytes:
+	"""
+	Job run inside a process executor, reads the whole document (see batch._read_in_process).
+	Each worker process keeps its own template cache, shared with the other workers through its directory (if any).
+	Unless errors are isolated in the result, they are raised, so the executor sends them back as they are.
+	"""
+	global _worker_template_cache
+	if use_template_cache and (
+		_worker_template_cache is None or _worker_template_cache.directory != template_cache_directory
+	):
+		_worker_template_cache = TemplateCache(directory=template_cache_directory)
+
+	if not isolate_errors:
+		return _pack(
+			result=ReadManyResult(
+				file_path=file_path,
+				result=AbstractDocx.load(
+					content=content,
+					file_path=file_path,
+					logging_level=logging_level,
+					template_cache=_worker_template_cache if use_template_cache else None
+				)
+			)
+		)
+
+	return _pack(
+		result=_read_in_process(
+			file_path=file_path,
+			result_mode=result_mode,
+			template_cache=_worker_template_cache if use_template_cache else None,
+			logging_level=logging_level,
+			content=content
+		)
+	)
+
+
+async def _read_source(source: str | bytes, file_path: Optional[str]) -> tuple[bytes, str]:
+	"""
+	Raw bytes and file path of the document.
+	Files are read in the default executor of the event loop, so that disk I/O never blocks it.
+	"""
+	if isinstance(source, bytes):
+		return source, file_path if file_path is not None else "document.docx"
+
+	def _read_file() -> bytes:
+		with open(source, "rb") as f:
+			return f.read()
+
+	content: bytes = await asyncio.get_running_loop().run_in_executor(None, _read_file)
+
+	return content, file_path if file_path is not None else source
+
+
+async def _aread_in_process_executor(
+	content: bytes,
+	file_path: str,
+	executor: ProcessPoolExecutor,
+	result_mode: ReadManyResultMode,
+	template_cache: Optional[TemplateCache],
+	logging_level: str,
+	isolate_errors: bool = True
+) -> ReadManyResult:
+	"""
+	Offloads the whole pipeline of the document as a single job, since sending the document back and forth between
+	 processes at every pipeline stage would cost more than the stages themselves.
+	Cancellation only takes effect before the job starts, or once it finishes (its result is then discarded).
+	Unless errors are isolated in the result, they are raised (see _read_in_worker_process).
+	"""
+	loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+
+	result: ReadManyResult | bytes = await loop.run_in_executor(
+		executor,
+		partial(
+			_read_in_worker_process,
+			content=content,
+			file_path=file_path,
+			result_mode=result_mode,
+			use_template_cache=template_cache is not None,
+			template_cache_directory=template_cache.directory if template_cache is not None else None,
+			logging_level=logging_level,
+			isolate_errors=isolate_errors
+		)
+	)
+
+	# Unpickling objects is expensive, so it is kept out of the event loop as well
+	return await loop.run_in_executor(None, partial(_unpack, file_path=file_path, result=result))
+
+
+async def _aread_in_thread_executor(
+	content: bytes,
+	file_path: str,
+	executor: Optional[Executor],
+	template_cache: Optional[TemplateCache],
+	logging_level: str,
+	on_stage: Optional[OnStage]
+) -> AbstractDocx:
+	"""
+	Offloads each pipeline stage of the document as a separate job, the document stays in the calling process.
+	Cancellation takes effect between stages: the running stage is completed in its thread, but no further stage starts.
+	"""
+	loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+	AbstractDocx._setup_logger(logging_level=logging_level)
+
+	if on_stage is not None:
+		on_stage(PipelineStage.OOXML)
+	ooxml_docx: OoxmlDocx = await loop.run_in_executor(
+		executor,
+		partial(AbstractDocx._load_ooxml_docx, content=content, file_path=file_path, template_cache=template_cache)
+	)
+	abstract_docx: AbstractDocx = AbstractDocx(file_path=file_path, ooxml_docx=ooxml_docx)
+
+	for stage, construct in (
+		(PipelineStage.NORMALIZATION, partial(abstract_docx._normalize, template_cache=template_cache)),
+		(PipelineStage.HIERARCHIZATION, abstract_docx._hierarchize),
+		(PipelineStage.VIEWS, abstract_docx._load_views)
+	):
+		if on_stage is not None:
+			on_stage(stage)
+		await loop.run_in_executor(executor, construct)
+
+	return abstract_docx
+
+
+async def aread(
+	source: str | bytes,
+	file_path: Optional[str] = None,
+	executor: Optional[Executor] = None,
+	template_cache: Optional[TemplateCache] = None,
+	logging_level: str = "WARNING",
+	on_stage: Optional[OnStage] = None
+) -> AbstractDocx:
+	"""
+	Asynchronous version of AbstractDocx.read, the event loop is never blocked while the document is read.
+	The pipeline stages are offloaded to the given executor:
+	 - Thread executors (or None, the default executor of the event loop) run each stage as a separate job,
+	   so the document can be cancelled between stages.
+	 - Process executors run the whole pipeline as a single job (see _aread_in_process_executor),
+	   which does not contend for the GIL with the calling process, but cannot be cancelled while running.
+	   The document is sent back detached (only its views, see AbstractDocx.detach).
+
+	:param source: Path of the .docx file, or its raw bytes.
+	:param file_path: Path (or name) identifying the document, defaults to None (the source path, or "document.docx").
+	:param executor: Executor to which the pipeline stages are offloaded, defaults to None (default executor).
+	:param template_cache: Cache of the styles and numberings normalization shared between documents, defaults to None.
+	 Process executors only share it through its directory, each worker process keeps its own in memory entries.
+	:param logging_level: Logging level, defaults to "WARNING".
+	:param on_stage: Callback called at the start of each pipeline stage, defaults to None.
+	 Only called for the first stage with process executors.
+	:return: Abstract representation of the document.
+	 Errors are raised as they are with every executor, process executors chain the traceback of the worker process
+	 as their cause (see concurrent.futures.ProcessPoolExecutor).
+	"""
+	content, file_path = await _read_source(source=source, file_path=file_path)
+
+	if not isinstance(executor, ProcessPoolExecutor):
+		return await _aread_in_thread_executor(
+			content=content,
+			file_path=file_path,
+			executor=executor,
+			template_cache=template_cache,
+			logging_level=logging_level,
+			on_stage=on_stage
+		)
+
+	if on_stage is not None:
+		on_stage(PipelineStage.OOXML)
+	result: ReadManyResult = await _aread_in_process_executor(
+		content=content,
+		file_path=file_path,
+		executor=executor,
+		result_mode=ReadManyResultMode.OBJECT,
+		template_cache=template_cache,
+		logging_level=logging_level,
+		isolate_errors=False
+	)
+
+	return result.result
+
+
+async def aread_many(
+	sources: Iterable[str | bytes],
+	executor: Optional[Executor] = None,
+	concurrency: int = 8,
+	ordered: bool = True,
+	result_mode: ReadManyResultMode | str = ReadManyResultMode.OBJECT,
+	template_cache: Optional[TemplateCache] = None,
+	logging_level: str = "WARNING"
+) -> AsyncIterator[ReadManyResult]:
+	"""
+	Asynchronous version of AbstractDocx.read_many, reads several documents concurrently (see aread).
+	Errors are isolated per document, they are reported in the result (with the pipeline stage) instead of being raised.
+	Sources are pulled lazily, at most 'concurrency' documents are in flight (or finished but not yielded yet).
+	Closing the iterator early (or cancelling the task consuming it) cancels the documents still in flight.
+
+	:param sources: Paths of the .docx files, or their raw bytes.
+	:param executor: Executor to which the pipeline stages are offloaded, defaults to None (default executor).
+	:param concurrency: Maximum number of documents in flight, defaults to 8.
+	:param ordered: Whether to yield results in input order, or as soon as they complete, defaults to True.
+	:param result_mode: Whether to return the AbstractDocx object, its JSON dict or its text, defaults to the object.
+	 JSON dicts and text are much cheaper to send back from process executors than the object,
+	 which is sent back detached (only its views, see AbstractDocx.detach).
+	:param template_cache: Cache of the styles and numberings normalization shared between documents, defaults to None.
+	:param logging_level: Logging level, defaults to "WARNING".
+	:return: Asynchronous iterator of results, one for each document.
+	"""
+	result_mode = ReadManyResultMode(result_mode)
+	loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+
+	async def _aread_one(source: str | bytes, position: int) -> ReadManyResult:
+		file_path: str = source if isinstance(source, str) else f"document-{position}.docx"
+
+		stage: Optional[str] = None
+		def _on_stage(pipeline_stage: PipelineStage) -> None:
+			nonlocal stage
+			stage = pipeline_stage.value
+
+		try:
+			_on_stage(PipelineStage.OOXML)
+			content, file_path = await _read_source(source=source, file_path=file_path)
+
+			if isinstance(executor, ProcessPoolExecutor):
+				return await _aread_in_process_executor(
+					content=content,
+					file_path=file_path,
+					executor=executor,
+					result_mode=result_mode,
+					template_cache=template_cache,
+					logging_level=logging_level
+				)
+
+			abstract_docx: AbstractDocx = await _aread_in_thread_executor(
+				content=content,
+				file_path=file_path,
+				executor=executor,
+				template_cache=template_cache,
+				logging_level=logging_level,
+				on_stage=_on_stage
+			)
+
+			stage = _SERIALIZATION_STAGE
+			match result_mode:
+				case ReadManyResultMode.OBJECT:
+					return ReadManyResult(file_path=file_path, result=abstract_docx)
+				case ReadManyResultMode.JSON:
+					return ReadManyResult(
+						file_path=file_path, result=await loop.run_in_executor(executor, abstract_docx.to_dict)
+					)
+				case ReadManyResultMode.TEXT:
+					return ReadManyResult(
+						file_path=file_path, result=await loop.run_in_executor(executor, abstract_docx.to_text)
+					)
+		except Exception:
+			return ReadManyResult(file_path=file_path, error=traceback.format_exc(), stage=stage)
+
+	positioned_sources: Iterator[tuple[int, str | bytes]] = enumerate(sources)
+	tasks: deque[asyncio.Task[ReadManyResult]] = deque()  # Documents in flight (or not yielded yet), in input order
+
+	def _fill_window() -> None:
+		while len(tasks) < concurrency:
+			positioned_source: Optional[tuple[int, str | bytes]] = next(positioned_sources, None)
+			if positioned_source is None:
+				return
+			position, source = positioned_source
+			tasks.append(asyncio.create_task(_aread_one(source=source, position=position)))
+
+	try:
+		_fill_window()
+		while len(tasks) != 0:
+			if ordered:
+				result: ReadManyResult = await tasks[0]
+				tasks.popleft()
+			else:
+				await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+				completed_task: asyncio.Task[ReadManyResult] = next(task for task in tasks if task.done())
+				tasks.remove(completed_task)
+				result: ReadManyResult = completed_task.result()
+
+			# Refill before yielding, so that documents keep being read while the result is consumed
+			_fill_window()
+			yield result
+	finally:
+		for task in tasks:
+			task.cancel()
+		await asyncio.gather(*tasks, return_exceptions=True)
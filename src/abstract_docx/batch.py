@@ -0,0 +1,386 @@
+from __future__ import annotations
+from typing import Optional, Iterable, Iterator, Callable
+from enum import Enum
+from collections import deque
+import os
+import time
+import traceback
+import multiprocessing
+from multiprocessing.connection import Connection, wait
+
+from utils.pydantic import ArbitraryBaseModel
+
+from abstract_docx.normalization import TemplateCache
+from abstract_docx.main import AbstractDocx, PipelineStage
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class ReadManyResultMode(Enum):
+	OBJECT = "object"  # AbstractDocx object (sent back to the parent process detached and pickled, see AbstractDocx.detach)
+	JSON = "json"  # JSON serializable dict (see AbstractDocx.to_dict)
+	TEXT = "text"  # Plain text (see AbstractDocx.to_text)
+
+
+class ReadManyResult(ArbitraryBaseModel):
+	file_path: str
+	result: Optional[AbstractDocx | dict | str] = None
+	error: Optional[str] = None  # Formatted traceback of the error (or the budget exceeded) while reading the document
+	stage: Optional[str] = None  # Pipeline stage in which the error happened (see PipelineStage)
+
+	@property
+	def ok(self) -> bool:
+		return self.error is None
+
+
+# Stage of the result serialization inside the worker, after the pipeline stages
+_SERIALIZATION_STAGE: str = "serialization"
+
+# Number of times a document is rescheduled when its worker dies before starting it, before reporting it as failed
+_MAX_UNSTARTED_FAILURES: int = 2
+
+
+def _read_many_worker(
+	connection: Connection,
+	result_mode: ReadManyResultMode,
+	use_template_cache: bool,
+	template_cache_directory: Optional[str],
+	logging_level: str
+) -> None:
+	"""
+	Worker process of read_many, reads the chunks of documents sent by the supervisor until it receives None.
+	Messages sent back to the supervisor:
+	 - ("stage", document position, stage): At the start of each pipeline stage of a document.
+	 - ("result", document position, result): Once a document is finished (successfully or not).
+	   Objects are sent detached and pickled (see _pack).
+	"""
+	template_cache: Optional[TemplateCache] = (
+		TemplateCache(directory=template_cache_directory) if use_template_cache else None
+	)
+
+	while True:
+		chunk: Optional[list[tuple[int, str]]] = connection.recv()
+		if chunk is None:
+			break
+
+		for position, file_path in chunk:
+			result: ReadManyResult = _read_in_process(
+				file_path=file_path,
+				result_mode=result_mode,
+				template_cache=template_cache,
+				logging_level=logging_level,
+				on_stage=lambda stage, position=position: connection.send(("stage", position, stage))
+			)
+			connection.send(("result", position, _pack(result=result)))
+
+
+def _read_in_process(
+	file_path: str,
+	result_mode: ReadManyResultMode,
+	template_cache: Optional[TemplateCache],
+	logging_level: str,
+	on_stage: Optional[Callable[[PipelineStage | str], None]] = None,
+	content: Optional[bytes] = None
+) -> ReadManyResult:
+	"""
+	Reads a single document, isolating its errors in the result (together with the stage in which they happened).
+	The document is read from its raw bytes if given, otherwise from its file path.
+	"""
+	stage: Optional[str] = None
+	def _on_stage(pipeline_stage: PipelineStage | str) -> None:
+		nonlocal stage
+		stage = pipeline_stage.value if isinstance(pipeline_stage, PipelineStage) else pipeline_stage
+		if on_stage is not None:
+			on_stage(stage)
+
+	try:
+		if content is None:
+			abstract_docx: AbstractDocx = AbstractDocx.read(
+				file_path=file_path, logging_level=logging_level, on_stage=_on_stage, template_cache=template_cache
+			)
+		else:
+			abstract_docx: AbstractDocx = AbstractDocx.load(
+				content=content,
+				file_path=file_path,
+				logging_level=logging_level,
+				on_stage=_on_stage,
+				template_cache=template_cache
+			)
+
+		_on_stage(_SERIALIZATION_STAGE)
+		match result_mode:
+			case ReadManyResultMode.OBJECT:
+				return ReadManyResult(file_path=file_path, result=abstract_docx)
+			case ReadManyResultMode.JSON:
+				return ReadManyResult(file_path=file_path, result=abstract_docx.to_dict())
+			case ReadManyResultMode.TEXT:
+				return ReadManyResult(file_path=file_path, result=abstract_docx.to_text())
+	except Exception:
+		return ReadManyResult(file_path=file_path, error=traceback.format_exc(), stage=stage)
+
+
+def _pack(result: ReadManyResult) -> ReadManyResult | bytes:
+	"""
+	Result to send back from a worker process, objects are pickled since the default pickler cannot handle them.
+	Objects are detached first (see AbstractDocx.detach), pickling their OOXML docx would cost more than reading them.
+	"""
+	if isinstance(result.result, AbstractDocx):
+		return result.result.detach().to_pickle()
+
+	return result
+
+
+def _unpack(file_path: str, result: ReadManyResult | bytes) -> ReadManyResult:
+	"""
+	Inverse of _pack, result received from a worker process.
+	"""
+	if isinstance(result, bytes):
+		return ReadManyResult(file_path=file_path, result=AbstractDocx.from_pickle(result))
+
+	return result
+
+
+def _rss(pid: int) -> Optional[int]:
+	"""
+	Resident set size of a process, read from /proc (only available on Linux).
+	:param pid: Process id.
+	:return: RSS in bytes, None if it cannot be read.
+	"""
+	try:
+		with open(f"/proc/{pid}/statm", "rb") as f:
+			return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+	except (OSError, ValueError, IndexError):
+		return None
+
+
+class _SupervisedWorker:
+	"""
+	Worker process of read_many, together with the supervisor bookkeeping of the documents it is reading.
+	"""
+	__slots__ = ("process", "connection", "documents", "document_start", "document_start_rss", "stage")
+
+	def __init__(self, process: multiprocessing.Process, connection: Connection) -> None:
+		self.process: multiprocessing.Process = process
+		self.connection: Connection = connection
+		self.documents: deque[tuple[int, str]] = deque()  # Documents of the assigned chunk that are not finished yet
+		# Start time and worker RSS when the first unfinished document started (None until its first stage message)
+		self.document_start: Optional[float] = None
+		self.document_start_rss: Optional[int] = None
+		self.stage: Optional[str] = None  # Current pipeline stage of the first unfinished document
+
+	@property
+	def is_idle(self) -> bool:
+		return len(self.documents) == 0
+
+	@property
+	def is_document_started(self) -> bool:
+		return self.document_start is not None
+
+	def assign(self, chunk: list[tuple[int, str]]) -> None:
+		self.documents.extend(chunk)
+		self.connection.send(chunk)
+
+	def start_stage(self, stage: str) -> None:
+		if not self.is_document_started:
+			self.document_start = time.monotonic()
+			self.document_start_rss = _rss(pid=self.process.pid)
+		self.stage = stage
+
+	def finish_document(self) -> tuple[int, str]:
+		document: tuple[int, str] = self.documents.popleft()
+		self.document_start = None
+		self.document_start_rss = None
+		self.stage = None
+
+		return document
+
+	def kill(self) -> None:
+		self.process.kill()
+		self.process.join()
+		self.connection.close()
+
+
+def read_many(
+	file_paths: Iterable[str],
+	workers: Optional[int] = None,
+	chunksize: int = 1,
+	ordered: bool = True,
+	result_mode: ReadManyResultMode | str = ReadManyResultMode.OBJECT,
+	timeout: Optional[float] = None,
+	max_rss: Optional[int] = None,
+	use_template_cache: bool = True,
+	template_cache_directory: Optional[str] = None,
+	logging_level: str = "WARNING",
+	poll_interval: float = 0.05
+) -> Iterator[ReadManyResult]:
+	"""
+	Reads several documents in parallel with a pool of worker processes watched by a supervisor (the calling process).
+	Documents are scheduled in chunks (one message per chunk) to amortize the inter-process communication.
+	Errors are isolated per document, they are reported in the result (with the pipeline stage) instead of being raised.
+
+	Each document has a wall-clock and a resident memory (RSS) budget.
+	When a document exceeds its budget (or its worker dies, e.g. killed by the OS), the worker is killed,
+	 the document is reported as failed in the stage it was in, and the rest of its chunk is rescheduled on a new worker.
+	Budgets start at the first pipeline stage of each document (not when its chunk is assigned).
+
+	:param file_paths: Paths of the .docx files.
+	:param workers: Number of worker processes, defaults to None (number of CPUs).
+	 0 reads the documents in the calling process, without budgets.
+	:param chunksize: Number of documents per chunk, defaults to 1.
+	:param ordered: Whether to yield results in input order, or as soon as they complete, defaults to True.
+	:param result_mode: Whether to return the AbstractDocx object, its JSON dict or its text, defaults to the object.
+	 JSON dicts and text are much cheaper to send back from the workers than the object,
+	 which is sent back detached (only its views, see AbstractDocx.detach).
+	:param timeout: Wall-clock budget in seconds of each document, defaults to None (no budget).
+	:param max_rss: RSS budget in bytes of the worker while reading a document, defaults to None (no budget).
+	 Measured as the RSS increase over the worker RSS when the document started, since forked workers start with
+	 the (shared) pages of the calling process, and keep the template cache between documents.
+	 Only enforced on platforms exposing /proc (Linux).
+	:param use_template_cache: Whether each worker reuses the styles and numberings normalization of already seen templates,
+	 defaults to True.
+	:param template_cache_directory: Directory in which the workers persist (and share) the template cache, defaults to None.
+	:param logging_level: Logging level of the workers, defaults to "WARNING".
+	:param poll_interval: Time in seconds between budget checks, defaults to 0.05.
+	:return: Iterator of results, one for each document.
+	:raises ValueError: If the chunksize is lower than 1, or a budget is not positive.
+	"""
+	if chunksize < 1:
+		raise ValueError(f"The chunksize must be at least 1 ({chunksize=}).")
+	if timeout is not None and timeout <= 0:
+		raise ValueError(f"The wall-clock budget must be positive ({timeout=}).")
+	if max_rss is not None and max_rss <= 0:
+		raise ValueError(f"The RSS budget must be positive ({max_rss=}).")
+
+	result_mode = ReadManyResultMode(result_mode)
+	documents: list[tuple[int, str]] = list(enumerate(file_paths))
+	pending_chunks: deque[list[tuple[int, str]]] = deque(
+		documents[i:i+chunksize] for i in range(0, len(documents), chunksize)
+	)
+	n_workers: int = min(workers if workers is not None else os.cpu_count() or 1, len(pending_chunks))
+
+	def _start_worker() -> _SupervisedWorker:
+		supervisor_connection, worker_connection = multiprocessing.Pipe()
+		process: multiprocessing.Process = multiprocessing.Process(
+			target=_read_many_worker,
+			args=(worker_connection, result_mode, use_template_cache, template_cache_directory, logging_level),
+			daemon=True
+		)
+		process.start()
+		worker_connection.close()
+
+		return _SupervisedWorker(process=process, connection=supervisor_connection)
+
+	results: dict[int, ReadManyResult] = {}
+
+	# Number of times each document was rescheduled because its worker died before starting it
+	n_unstarted_failures: dict[int, int] = {}
+
+	def _replace_worker(supervised_worker: _SupervisedWorker, error: str) -> None:
+		"""
+		Kills the worker, reports its current document as failed and reschedules the rest of its chunk on a new worker.
+		The current document is only reported once it started (a stage message was received for it),
+		 otherwise the whole chunk is rescheduled (up to _MAX_UNSTARTED_FAILURES times, e.g. if workers die on startup).
+		"""
+		position, file_path = supervised_worker.documents[0]
+		n_unstarted_failures[position] = n_unstarted_failures.get(position, 0) + int(not supervised_worker.is_document_started)
+		if supervised_worker.is_document_started or n_unstarted_failures[position] > _MAX_UNSTARTED_FAILURES:
+			supervised_worker.documents.popleft()
+			logger.warning(f"Killing read_many worker reading {file_path=} (stage={supervised_worker.stage}): {error}")
+			results[position] = ReadManyResult(file_path=file_path, error=error, stage=supervised_worker.stage)
+		else:
+			logger.warning(f"Killing read_many worker before reading {file_path=}, rescheduling its chunk: {error}")
+
+		if len(supervised_worker.documents) != 0:
+			pending_chunks.appendleft(list(supervised_worker.documents))
+
+		supervised_worker.kill()
+		supervised_workers[supervised_workers.index(supervised_worker)] = _start_worker()
+
+	if n_workers == 0:
+		# Reads in the calling process, without budgets (useful for debugging)
+		template_cache: Optional[TemplateCache] = (
+			TemplateCache(directory=template_cache_directory) if use_template_cache else None
+		)
+		for _, file_path in documents:
+			yield _read_in_process(
+				file_path=file_path, result_mode=result_mode, template_cache=template_cache, logging_level=logging_level
+			)
+		return
+
+	n_yielded: int = 0
+	next_position: int = 0  # Next result to yield when ordered
+	supervised_workers: list[_SupervisedWorker] = [_start_worker() for _ in range(n_workers)]
+	try:
+		while n_yielded < len(documents):
+			# Schedule pending chunks into idle workers
+			for supervised_worker in supervised_workers:
+				if supervised_worker.is_idle and len(pending_chunks) != 0:
+					try:
+						supervised_worker.assign(chunk=pending_chunks.popleft())
+					except OSError:
+						# The worker died before receiving its chunk
+						supervised_worker.process.join(timeout=1)
+						_replace_worker(
+							supervised_worker=supervised_worker,
+							error=f"Worker process died (exit code {supervised_worker.process.exitcode})."
+						)
+
+			# Handle the messages from the busy workers
+			busy_workers: list[_SupervisedWorker] = [w for w in supervised_workers if not w.is_idle]
+			for connection in wait([w.connection for w in busy_workers], timeout=poll_interval):
+				supervised_worker: _SupervisedWorker = next(w for w in busy_workers if w.connection is connection)
+				try:
+					while not supervised_worker.is_idle and supervised_worker.connection.poll():
+						message: tuple = supervised_worker.connection.recv()
+						match message[0]:
+							case "stage":
+								supervised_worker.start_stage(stage=message[2])
+							case "result":
+								position, file_path = supervised_worker.finish_document()
+								results[position] = _unpack(file_path=file_path, result=message[2])
+				except (EOFError, OSError):
+					# The worker died without reporting (e.g. killed by the OS because of memory exhaustion)
+					supervised_worker.process.join(timeout=1)
+					_replace_worker(
+						supervised_worker=supervised_worker,
+						error=f"Worker process died (exit code {supervised_worker.process.exitcode})."
+					)
+
+			# Enforce the budgets of the documents being read
+			now: float = time.monotonic()
+			for supervised_worker in [w for w in supervised_workers if w.is_document_started]:
+				error: Optional[str] = None
+				if timeout is not None and now - supervised_worker.document_start > timeout:
+					error = f"Wall-clock budget exceeded ({timeout}s)."
+				elif max_rss is not None and supervised_worker.document_start_rss is not None:
+					rss: Optional[int] = _rss(pid=supervised_worker.process.pid)
+					if rss is not None and rss - supervised_worker.document_start_rss > max_rss:
+						error = (
+							f"RSS budget exceeded ({rss - supervised_worker.document_start_rss} > {max_rss} bytes "
+							f"over the {supervised_worker.document_start_rss} bytes of the worker when the document started)."
+						)
+
+				if error is not None:
+					_replace_worker(supervised_worker=supervised_worker, error=error)
+
+			# Yield the available results
+			if ordered:
+				while next_position in results:
+					yield results.pop(next_position)
+					next_position += 1
+					n_yielded += 1
+			else:
+				for position in list(results.keys()):
+					yield results.pop(position)
+					n_yielded += 1
+	finally:
+		for supervised_worker in supervised_workers:
+			try:
+				supervised_worker.connection.send(None)
+			except OSError:
+				pass
+		for supervised_worker in supervised_workers:
+			supervised_worker.process.join(timeout=1)
+			if supervised_worker.process.is_alive():
+				supervised_worker.kill()
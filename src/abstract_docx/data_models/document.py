@@ -1,5 +1,6 @@
 from __future__ import annotations
 from typing import Optional
+from dataclasses import dataclass, field
 
 from utils.pydantic import ArbitraryBaseModel
 
@@ -8,8 +9,15 @@ from abstract_docx.data_models.numberings import Index, ImpliedIndex
 
 import ooxml_docx.document.run as OOXML_RUN
 
+# Runtime document data model:
+# Plain slotted dataclasses instead of pydantic models, since documents hold a large number of instances
+#  that are only built by the normalization (no need for per-instance validation).
+# These dataclasses are also the public document types (see DocumentView): they are mutable and not validated.
+# Blocks are compared by identity, since they reference their parent and children.
 
-class Format(ArbitraryBaseModel):
+
+@dataclass(slots=True, eq=False, kw_only=True)
+class Format:
 	style: Style
 	index: Optional[Index] = None
 	implied_index: Optional[ImpliedIndex] = None
@@ -25,15 +33,17 @@ class Format(ArbitraryBaseModel):
 		return self.index_str is not None
 
 
-class Block(ArbitraryBaseModel):
+@dataclass(slots=True, eq=False, kw_only=True)
+class Block:
 	id: int
 	format: Optional[Format] = None  # Only the root block of the document will have empty format
 
-	parent: Optional[Block] = None
+	parent: Optional[Block] = field(default=None, repr=False)
 	children: Optional[list[Block]] = None
 
 
-class Run(ArbitraryBaseModel):
+@dataclass(slots=True, kw_only=True)
+class Run:
 	text: str
 	style: Style
 
@@ -51,7 +61,8 @@ class Run(ArbitraryBaseModel):
 		self.text += other.text
 
 
-class Hyperlink(ArbitraryBaseModel):
+@dataclass(slots=True, kw_only=True)
+class Hyperlink:
 	content: list[Run]
 	target: Optional[str] = None
 	style: Style
@@ -63,6 +74,7 @@ class Hyperlink(ArbitraryBaseModel):
 
 PARAGRAPH_CONTENT = list[Run | Hyperlink]
 
+@dataclass(slots=True, eq=False, kw_only=True)
 class Paragraph(Block):
 	content: PARAGRAPH_CONTENT
 
@@ -70,25 +82,29 @@ class Paragraph(Block):
 		return "".join([content.text for content in self.content])
 
 
-class CellMergeRange(ArbitraryBaseModel):
+@dataclass(slots=True, kw_only=True)
+class CellMergeRange:
 	start_row_loc: int
 	start_column_loc: int
 	row_span: int
 	column_span: int
 
 
-class Cell(ArbitraryBaseModel):
+@dataclass(slots=True, eq=False, kw_only=True)
+class Cell:
 	loc: tuple[int, int]
 	blocks: list[Block]
 
 	def __str__(self):
 		return " ".join([str(block) for block in self.blocks])  # TODO: it will fail for nested tables but cannot be bothered for now
 
-class Row(ArbitraryBaseModel):
+@dataclass(slots=True, eq=False, kw_only=True)
+class Row:
 	loc: int
 	cells: list[Cell]
 
 
+@dataclass(slots=True, eq=False, kw_only=True)
 class Table(Block):
 	rows: list[Row]
 	cell_merge_ranges: Optional[list[CellMergeRange]] = None
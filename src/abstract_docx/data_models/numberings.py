@@ -1,8 +1,10 @@
 from __future__ import annotations
-from typing import Optional, Any
+from typing import Optional, Any, Iterable
+from pydantic import PrivateAttr
 from enum import Enum
 
 import re
+from functools import lru_cache
 
 from num2words import num2words
 import roman
@@ -189,6 +191,33 @@ class MarkerType(Enum):
 				# TODO: support for numbers larger than 3999
 				return r"\b(?=[MDCLXVI])M{0,3}(?:CM|CD|D?C{0,3})(?:XC|XL|L?X{0,3})(?:IX|IV|V?I{0,3})\b"
 
+	def detection_prefix_regex(self) -> Optional[str]:
+		"""
+		Cheap regex matching (at least) any marker token matched by the detection regex, without its word boundaries.
+		:return: Token regex, None if there is no detection regex or its token cannot be bounded.
+		"""
+		match self:
+			case MarkerType.BULLET:
+				return r"·"
+			case MarkerType.DECIMAL:
+				return r"\d+"
+			case MarkerType.DECIMAL_LEADING_ZERO:
+				return rf"(?:{self.detection_regex()})"  # Follows the (strange) grouping of its detection regex
+			case MarkerType.DECIMAL_ENCLOSED_CIRCLE:
+				return r"[\u2460-\u2473]"
+			case MarkerType.DECIMAL_ORDINAL:
+				return r"\d*(?:1st|2nd|3rd|[4-9]th)"
+			case MarkerType.LOWER_LETTER:
+				return r"[a-z]+"
+			case MarkerType.UPPER_LETTER:
+				return r"[A-Z]+"
+			case MarkerType.LOWER_ROMAN:
+				return r"(?=[mdclxvi])[mdclxvi]*"
+			case MarkerType.UPPER_ROMAN:
+				return r"(?=[MDCLXVI])[MDCLXVI]*"
+			case _:
+				return None
+
 	def counter(self, s: str) -> int:
 		"""Parse a marker string and return its integer counter value (1-based)."""
 		match self:
@@ -372,6 +401,13 @@ class LevelProperties(ArbitraryBaseModel):
 		
 		return cls()
 
+	@property
+	def deduplication_key(self) -> tuple:
+		"""
+		Canonical hashable key, two level properties are equal if and only if their keys are equal.
+		"""
+		return (self.marker_pattern, self.marker_type, self.whitespace, self.start, self.restart, self.override_start)
+
 	@classmethod
 	def aggregate_ooxml(cls, agg: Optional[LevelProperties], add: Optional[LevelProperties]) -> LevelProperties:
 		match agg is not None, add is not None:
@@ -408,20 +444,55 @@ class Level(ArbitraryBaseModel):
 		
 		raise ValueError("") # TODO
 
+	@property
+	def deduplication_key(self) -> tuple:
+		"""
+		Canonical hashable key, consistent with the level equality (properties and style properties).
+		"""
+		return (self.properties.deduplication_key, self.style.properties.deduplication_key)
+
 
 class Enumeration(ArbitraryBaseModel):
 	id: str
 
 	levels: dict[int, Level]
 
+	# Level id -> level key index (first level key of each level id)
+	_level_keys: dict[str, int] = PrivateAttr(default_factory=dict)
+	# Memoized formatted index counters (see format)
+	_formatted_index_ctrs: dict[IndexCounters, str] = PrivateAttr(default_factory=dict)
+
+	def model_post_init(self, __context: Any) -> None:
+		self.reindex_levels()
+
+	def reindex_levels(self) -> None:
+		"""
+		Rebuilds the level id -> level key index, must be called whenever the levels (or their ids) are replaced.
+		"""
+		self._level_keys = {}
+		for level_key, level in self.levels.items():
+			self._level_keys.setdefault(level.id, level_key)
+		self._formatted_index_ctrs = {}
+
+	def level_key(self, level_id: str) -> Optional[int]:
+		"""
+		:param level_id: Level id.
+		:return: Level key of the level inside the enumeration, None if the enumeration does not contain the level.
+		"""
+		return self._level_keys.get(level_id)
+
 	def __eq__(self, v: Any) -> bool:
 		if isinstance(v, Enumeration):
 			return self.levels == v.levels
 		
 		raise ValueError("") # TODO
 
-	def format(self, index_ctr: Optional[dict[int, int]]) -> str:
+	def format(self, index_ctr: Optional[IndexCounters]) -> str:
 		# TODO: raise error if index_ctr is None
+		formatted_index_ctr: Optional[str] = self._formatted_index_ctrs.get(index_ctr)
+		if formatted_index_ctr is not None:
+			return formatted_index_ctr
+
 		if not all([lk in self.levels.keys() for lk in index_ctr.keys()]):
 			raise KeyError("Index counters could not be mapped to levels.")
 		
@@ -431,7 +502,10 @@ class Enumeration(ArbitraryBaseModel):
 		
 		marker_pattern: str = self.levels[max(index_ctr.keys())].properties.marker_pattern.format(levels_strings=level_strings)
 		whitespace: str = self.levels[max(index_ctr.keys())].properties.whitespace.format()
-		return f"{marker_pattern}{whitespace}"
+		
+		formatted_index_ctr = f"{marker_pattern}{whitespace}"
+		self._formatted_index_ctrs[index_ctr] = formatted_index_ctr
+		return formatted_index_ctr
 	
 	@cached_property
 	def detection_regexes(self) -> dict[int, Optional[re.Pattern]]:
@@ -465,30 +539,172 @@ class Enumeration(ArbitraryBaseModel):
 
 		return level_regexes
 
+	@cached_property
+	def detection_patterns(self) -> dict[int, re.Pattern]:
+		"""
+		Compiled detection regexes of the levels that can be used for detection.
+		"""
+		# ! TODO: It can happen where the dummy regex does not contain any capturing groups, leading to an error when trying to extract the level key index string
+		# TODO: Investigate how is this even possible => What is even the use of constructing this regex that won't be used? => It comes from the Word file itself...
+		# Hotfix => Only use detection regexes that have at least one capturing group
+		detection_patterns: dict[int, re.Pattern] = {}
+		for level_id, detection_regex in self.detection_regexes.items():
+			if detection_regex is not None:
+				detection_pattern: re.Pattern = re.compile(detection_regex)
+				if detection_pattern.groups != 0:
+					detection_patterns[level_id] = detection_pattern
+		
+		return detection_patterns
+
+	@cached_property
+	def detection_prefix_regexes(self) -> dict[int, Optional[str]]:
+		"""
+		Regexes matching the first token of the detection patterns matches: the literal characters before the first level index,
+		 the level index token and the delimiter that follows it (or the whitespace, if the marker pattern ends with it).
+		None if the level index token cannot be bounded.
+		"""
+		detection_prefix_regexes: dict[int, Optional[str]] = {}
+		for level_id in self.detection_patterns.keys():
+			level: Level = self.levels[level_id]
+			marker_pattern: MarkerPattern = level.properties.marker_pattern
+			placeholder_match: Optional[re.Match] = re.search(r"\{(\d+)\}", marker_pattern)
+			if (
+				placeholder_match is not None
+				and int(placeholder_match.group(1)) <= level_id
+				and self.levels[int(placeholder_match.group(1))].properties.marker_type.detection_regex() is not None
+			):
+				token_regex: Optional[str] = (
+					self.levels[int(placeholder_match.group(1))].properties.marker_type.detection_prefix_regex()
+				)
+				if token_regex is None:
+					detection_prefix_regexes[level_id] = None
+					continue
+
+				following: str = marker_pattern[placeholder_match.end():]
+				next_placeholder_match: Optional[re.Match] = re.search(r"\{\d+\}", following)
+				delimiter: str = following[:next_placeholder_match.start()] if next_placeholder_match is not None else following
+				detection_prefix_regexes[level_id] = (
+					f"{re.escape(marker_pattern[:placeholder_match.start()])}{token_regex}{re.escape(delimiter)}"
+					+ (level.properties.whitespace.detection_regex() if following == "" else "")
+				)
+			else:
+				# Marker pattern without a (detected) level index before its first character
+				detection_prefix_regexes[level_id] = re.escape(marker_pattern[0])
+		
+		return detection_prefix_regexes
+
 	def detect(self, run: "Run") -> dict[str, list[Level]]:  # Type hint as string to avoid circular import hell
 		matches: dict[str, list[Level]] = {
 			"regex_and_style": [],
 			"regex_only": []
 		}
 		
-		# detection_regexes: dict[int, Optional[re.Pattern]] = self.detection_regexes => ??
-		for level_id, level in self.levels.items():
-			detection_regex: Optional[re.Pattern] = self.detection_regexes[level_id]
-
-			# ! TODO: It can happen where the dummy regex does not contain any capturing groups, leading to an error when trying to extract the level key index string
-			# TODO: Investigate how is this even possible => What is even the use of constructing this regex that won't be used? => It comes from the Word file itself...
-			# Hotfix => Only use detection regexes that have at least one capturing group
-			if detection_regex is not None and re.compile(detection_regex).groups != 0:		
-				match = re.match(detection_regex, run.text)
-				if match is not None:
-					# Only take run style properties into account,
-					# since using paragraph style properties too can lead to false negatives
-					if level.style.properties.run_style_properties == run.style.properties.run_style_properties:
-						matches["regex_and_style"].append(level)
-					else:
-						matches["regex_only"].append(level)
+		for level_id, detection_pattern in self.detection_patterns.items():
+			if detection_pattern.match(run.text) is not None:
+				level: Level = self.levels[level_id]
+				# Only take run style properties into account,
+				# since using paragraph style properties too can lead to false negatives
+				if level.style.properties.run_style_properties == run.style.properties.run_style_properties:
+					matches["regex_and_style"].append(level)
+				else:
+					matches["regex_only"].append(level)
 		
 		return matches
+
+
+@lru_cache(maxsize=256)
+def _compile_combined_detection_regex(detection_regexes: tuple[str, ...]) -> re.Pattern:
+	"""
+	Compiles the detection regexes into a single pattern, where the match of the i-th detection regex
+	 (at the start of the text) is captured by the named group 'd{i}'.
+	Each detection regex is wrapped into an optional lookahead, so a single match reports every detection regex that matches,
+	 not only the first one as an alternation would.
+	Cached so that documents sharing the same detection regexes share the same compiled pattern.
+	"""
+	return re.compile("".join(
+		f"(?:(?=(?P<d{i}>{detection_regex}))|)" for i, detection_regex in enumerate(detection_regexes)
+	))
+
+
+class EnumerationsDetector(ArbitraryBaseModel):
+	"""
+	Detection of the levels of several enumerations in a single scan of the text.
+	Equal detection regexes (shared between enumerations) are only matched once.
+	"""
+	candidates: list[tuple[Enumeration, Level, int]]  # (enumeration, level, detection regex group position)
+	pattern: Optional[re.Pattern]
+	# Cheap check on the first token of the text, None if it cannot be bounded (every text goes through the pattern)
+	prefilter: Optional[re.Pattern]
+
+	# Number of texts checked, and rejected by the prefilter without going through the pattern
+	_n_checks: int = 0
+	_n_prefilter_rejections: int = 0
+
+	@classmethod
+	def build(cls, enumerations: Iterable[Enumeration]) -> EnumerationsDetector:
+		detection_regexes: dict[str, int] = {}
+		detection_prefix_regexes: set[Optional[str]] = set()
+		candidates: list[tuple[Enumeration, Level, int]] = []
+		for enumeration in enumerations:
+			for level_id, detection_pattern in enumeration.detection_patterns.items():
+				candidates.append((
+					enumeration,
+					enumeration.levels[level_id],
+					detection_regexes.setdefault(detection_pattern.pattern, len(detection_regexes))
+				))
+				detection_prefix_regexes.add(enumeration.detection_prefix_regexes[level_id])
+
+		return cls(
+			candidates=candidates,
+			pattern=_compile_combined_detection_regex(tuple(detection_regexes)) if len(detection_regexes) != 0 else None,
+			prefilter=(
+				re.compile("|".join(sorted(detection_prefix_regexes)))
+				if len(detection_prefix_regexes) != 0 and None not in detection_prefix_regexes else None
+			)
+		)
+
+	@property
+	def n_checks(self) -> int:
+		return self._n_checks
+
+	@property
+	def n_prefilter_rejections(self) -> int:
+		return self._n_prefilter_rejections
+
+	def detect(self, run: "Run") -> dict[str, dict[str, list[Level]]]:  # Type hint as string to avoid circular import hell
+		"""
+		Same as Enumeration.detect for each enumeration, only keeping the enumerations with at least one detected level.
+		:param run: Run whose text is used for the detection.
+		:return: Detected levels (split by whether the level style also matches) by enumeration id.
+		"""
+		matches: dict[str, dict[str, list[Level]]] = {}
+		if self.pattern is None:
+			return matches
+
+		self._n_checks += 1
+		if self.prefilter is not None and run.text != "" and self.prefilter.match(run.text) is None:
+			self._n_prefilter_rejections += 1
+			return matches
+
+		detected: tuple[Optional[str], ...] = self.pattern.match(run.text).groups()
+		for enumeration, level, position in self.candidates:
+			# Detection regex group position in the combined pattern groups (taking into account the detection regexes own groups)
+			if detected[self._group_indexes[position]] is not None:
+				enumeration_matches: dict[str, list[Level]] = matches.setdefault(
+					enumeration.id, {"regex_and_style": [], "regex_only": []}
+				)
+				# Only take run style properties into account,
+				# since using paragraph style properties too can lead to false negatives
+				if level.style.properties.run_style_properties == run.style.properties.run_style_properties:
+					enumeration_matches["regex_and_style"].append(level)
+				else:
+					enumeration_matches["regex_only"].append(level)
+
+		return matches
+
+	@cached_property
+	def _group_indexes(self) -> list[int]:
+		return [self.pattern.groupindex[f"d{i}"] - 1 for i in range(len(self.pattern.groupindex))]
 	
 
 class Numbering(ArbitraryBaseModel):
@@ -498,13 +714,38 @@ class Numbering(ArbitraryBaseModel):
 	enumerations: dict[str, Enumeration]
 
 
+class IndexCounters(tuple):
+	"""
+	Immutable index counters of an index, positioned by level key (None for the levels without index counter).
+	Hashable, so it can be used to memoize the formatted index string (see Enumeration.format).
+	"""
+
+	@classmethod
+	def from_level_counters(cls, level_counters: dict[int, Optional[int]], level_key: int) -> IndexCounters:
+		"""
+		:param level_counters: Current index counters of the numbering by level key.
+		:param level_key: Level key of the index, index counters of deeper levels are not included.
+		:return: Index counters up to the given level key.
+		"""
+		return cls(level_counters.get(k) for k in range(level_key + 1))
+
+	def keys(self) -> list[int]:
+		return [k for k, v in enumerate(self) if v is not None]
+
+	def items(self) -> list[tuple[int, int]]:
+		return [(k, v) for k, v in enumerate(self) if v is not None]
+
+	def __repr__(self) -> str:
+		return repr(dict(self.items()))
+
+
 class Index(ArbitraryBaseModel):
 	numbering: Numbering
 	enumeration: Enumeration
 	level: Level
 
 	_index_str: Optional[str] = None
-	index_ctr: Optional[dict[int, int]] = None
+	index_ctr: Optional[IndexCounters] = None
 
 	@property
 	def index_str(self):
@@ -553,20 +794,32 @@ class NumberingsView(ArbitraryBaseModel):
 			}
 		)
 
-	@property
+	@cached_property
 	def priorities(self) -> dict[int, list[Level]]:
 		return {
 			priority: [self.levels[level_id] for level_id in levels_keys]
 			for priority, levels_keys in self.priority_keys.items()
 		}
 	
-	def _find_priority(self, level: Level) -> int:
-		# TODO make it cleaner
+	@cached_property
+	def priority_ranks(self) -> dict[str, int]:
+		"""
+		Inverted priority keys, precomputed level id -> priority map for constant time priority lookups.
+		If a level id is found in more than one priority, the first one is kept.
+		"""
+		ranks: dict[str, int] = {}
 		for priority, level_ids_in_priority in self.priority_keys.items():
-			if level.id in level_ids_in_priority:
-				return priority
+			for level_id in level_ids_in_priority:
+				ranks.setdefault(level_id, priority)
+		
+		return ranks
+
+	def _find_priority(self, level: Level) -> int:
+		priority: Optional[int] = self.priority_ranks.get(level.id)
+		if priority is None:
+			raise KeyError("") # TODO
 		
-		raise KeyError("") # TODO
+		return priority
 	
 
 	def priority_difference(
@@ -585,19 +838,13 @@ class NumberingsView(ArbitraryBaseModel):
 				if curr_index.level.id == prev_index.level.id:
 					return 0
 				
-				curr_level_key: int = -1
-				prev_level_key: int = -1
-				for level_key, level in curr_index.enumeration.levels.items():
-					if curr_index.level.id == level.id:
-						curr_level_key = level_key
-					if prev_index.level.id == level.id:
-						prev_level_key = level_key
-					
-					if curr_level_key != -1 and prev_level_key != -1:
-						if curr_level_key < prev_level_key:
-							return 1
-						elif curr_level_key > prev_level_key:
-							return -1
+				curr_level_key: Optional[int] = curr_index.enumeration.level_key(level_id=curr_index.level.id)
+				prev_level_key: Optional[int] = curr_index.enumeration.level_key(level_id=prev_index.level.id)
+				if curr_level_key is not None and prev_level_key is not None:
+					if curr_level_key < prev_level_key:
+						return 1
+					elif curr_level_key > prev_level_key:
+						return -1
 				
 				raise ValueError("")
 
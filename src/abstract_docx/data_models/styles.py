@@ -1,17 +1,93 @@
 from __future__ import annotations
-from typing import Optional, Any
+from typing import Optional, Any, Callable, ClassVar
 from enum import Enum
+from functools import cached_property
+
+from lxml import etree
+from lxml.etree import _Element as etreeElement
 
 from colour import Color
 
 from utils.pydantic import ArbitraryBaseModel
-from pydantic import field_serializer
+from pydantic import field_serializer, ConfigDict
 
-from ooxml_docx.ooxml import OoxmlElement
 import ooxml_docx.structure.properties as OOXML_PROPERTIES
 from ooxml_docx.structure.styles import OoxmlStyles
 
 
+# Extracts the raw value of a supported child element, receives the child element and its namespace prefix ('{...}')
+OoxmlChildExtractor = Callable[[etreeElement, str], Any]
+
+
+def _extract_val(el: etreeElement, ns: str) -> Optional[str]:
+	return el.get(f"{ns}val")
+
+
+def _extract_element(el: etreeElement, ns: str) -> etreeElement:
+	return el
+
+
+def _extract_ooxml_children(
+	el: etreeElement, dispatch_table: dict[str, tuple[str, OoxmlChildExtractor]]
+) -> dict[str, Any]:
+	"""
+	Single pass extraction of the supported properties of an OOXML properties element (<w:rPr>, <w:pPr>...).
+	Iterates once over the children of the element, dispatching on their local name through the given table,
+	 instead of running one xpath query for each one of the supported properties.
+
+	:param el: OOXML properties element.
+	:param dispatch_table: Dictionary with the child local name as key and the field name and extractor as value.
+	:return: Dictionary with the extracted raw value for each one of the fields found.
+	:raises ValueError: Raises error if a supported child element is found more than once.
+	"""
+	namespace: Optional[str] = etree.QName(el).namespace
+	ns: str = f"{{{namespace}}}" if namespace is not None else ""
+
+	values: dict[str, Any] = {}
+	for child in el:
+		tag = child.tag
+		if not isinstance(tag, str) or not tag.startswith(ns):
+			continue  # Comments, processing instructions or elements from other namespaces
+		
+		local_name: str = tag[len(ns):]
+		dispatch: Optional[tuple[str, OoxmlChildExtractor]] = dispatch_table.get(local_name)
+		if dispatch is None:
+			continue
+		
+		field, extractor = dispatch
+		if field in values:
+			raise ValueError(f"Duplicated <w:{local_name}> element inside <w:{etree.QName(el).localname}>")
+		values[field] = extractor(child, ns)
+	
+	return values
+
+
+def _fingerprint_ooxml_children(
+	el: Optional[etreeElement], dispatch_table: dict[str, tuple[str, OoxmlChildExtractor]]
+) -> Optional[tuple]:
+	"""
+	Canonical fingerprint of the supported children of an OOXML properties element.
+	Every supported child is an attribute only leaf element, so its tag and sorted attributes fully define it
+	 (equivalent to its c14n representation, without paying for the serialization).
+	Unsupported children are left out, since they do not have an effect on the extracted properties.
+
+	:param el: OOXML properties element.
+	:param dispatch_table: Dictionary with the supported child local names as keys.
+	:return: Hashable fingerprint, None if no element is given.
+	"""
+	if el is None:
+		return None
+	
+	namespace: Optional[str] = etree.QName(el).namespace
+	ns: str = f"{{{namespace}}}" if namespace is not None else ""
+
+	return tuple(
+		(child.tag, tuple(sorted(child.attrib.items())))
+		for child in el
+		if isinstance(child.tag, str) and child.tag.startswith(ns) and child.tag[len(ns):] in dispatch_table
+	)
+
+
 class FontSize(float):
 	@classmethod
 	def default(cls) -> FontSize:
@@ -103,14 +179,15 @@ class ToggleProperty(int):  # Subclass of int, because python will not let me do
 				return False
 
 	@classmethod
-	def from_ooxml(cls, el: Optional[OoxmlElement], must_default: bool=False) -> Optional[ToggleProperty]:
+	def from_ooxml(cls, el: Optional[etreeElement], must_default: bool=False) -> Optional[ToggleProperty]:
 		if el is None:
 			if not must_default:
 				return None
 			
 			return cls.default()
 
-		v: Optional[str] = el.xpath_query(query="./@w:val", singleton=True)
+		namespace: Optional[str] = etree.QName(el).namespace
+		v: Optional[str] = el.get(f"{{{namespace}}}val" if namespace is not None else "val")
 
 		# If the element exists, but no val is specified it just means that is an implicit True
 		if v is None:
@@ -143,6 +220,8 @@ class Underline(ToggleProperty):
 
 
 class RunStyleProperties(ArbitraryBaseModel):
+	model_config = ConfigDict(frozen=True)
+
 	font_size: Optional[FontSize] = None
 	font_color: Optional[FontColor] = None
 	font_script: Optional[FontScript] = None
@@ -150,6 +229,16 @@ class RunStyleProperties(ArbitraryBaseModel):
 	italic: Optional[ToggleProperty] = None
 	underline: Optional[Underline] = None  
 
+	# Supported <w:rPr> children: local name -> (field, raw value extractor)
+	_OOXML_DISPATCH_TABLE: ClassVar[dict[str, tuple[str, OoxmlChildExtractor]]] = {
+		"sz": ("font_size", _extract_val),
+		"vertAlign": ("font_script", _extract_val),
+		"color": ("font_color", _extract_val),
+		"b": ("bold", _extract_element),
+		"i": ("italic", _extract_element),
+		"u": ("underline", _extract_element)
+	}
+
 	@classmethod
 	def default(cls) -> RunStyleProperties:
 		
@@ -173,25 +262,16 @@ class RunStyleProperties(ArbitraryBaseModel):
 		cls, run_properties: Optional[OOXML_PROPERTIES.RunProperties], must_default: bool=False
 	) -> RunStyleProperties:
 		if run_properties is not None:
+			values: dict[str, Any] = _extract_ooxml_children(
+				el=run_properties.element, dispatch_table=cls._OOXML_DISPATCH_TABLE
+			)
 			return cls(
-				font_size=FontSize.from_ooxml_val(
-					v=run_properties.xpath_query(query="./w:sz/@w:val", singleton=True), must_default=must_default
-				),
-				font_script=FontScript.from_ooxml_val(
-					v=run_properties.xpath_query(query="./w:vertAlign/@w:val", singleton=True), must_default=must_default
-				),
-				font_color=FontColor.from_ooxml_val(
-					v=run_properties.xpath_query(query="./w:color/@w:val", singleton=True), must_default=must_default
-				),
-				bold=Bold.from_ooxml(
-					el=run_properties.xpath_query(query="./w:b", singleton=True), must_default=must_default
-				),
-				italic=Italic.from_ooxml(
-					el=run_properties.xpath_query(query="./w:i", singleton=True), must_default=must_default
-				),				
-				underline=Underline.from_ooxml(
-					el=run_properties.xpath_query(query="./w:u", singleton=True), must_default=must_default
-				)
+				font_size=FontSize.from_ooxml_val(v=values.get("font_size"), must_default=must_default),
+				font_script=FontScript.from_ooxml_val(v=values.get("font_script"), must_default=must_default),
+				font_color=FontColor.from_ooxml_val(v=values.get("font_color"), must_default=must_default),
+				bold=Bold.from_ooxml(el=values.get("bold"), must_default=must_default),
+				italic=Italic.from_ooxml(el=values.get("italic"), must_default=must_default),
+				underline=Underline.from_ooxml(el=values.get("underline"), must_default=must_default)
 			)
 
 		if must_default:
@@ -214,19 +294,37 @@ class RunStyleProperties(ArbitraryBaseModel):
 			underline=default.underline or Underline(bool(add.underline) ^ agg.underline)
 		)
 	
-	def patch(self, other: RunStyleProperties) -> None:
-		if other.font_size is not None:
-			self.font_size = other.font_size
-		if other.font_color is not None:
-			self.font_color = other.font_color
-		if other.font_script is not None:
-			self.font_script = other.font_script
-		if other.bold is not None:
-			self.bold = other.bold
-		if other.italic is not None:
-			self.italic = other.italic
-		if other.underline is not None:
-			self.underline = other.underline
+	@property
+	def deduplication_key(self) -> tuple:
+		"""
+		Canonical hashable key, two run style properties are equal if and only if their keys are equal.
+		(Colors are compared through their rgb values, same as colour.Color equality)
+		"""
+		return (
+			self.font_size,
+			self.font_color.rgb if self.font_color is not None else None,
+			self.font_script,
+			self.bold,
+			self.italic,
+			self.underline
+		)
+
+	def derive(self, other: RunStyleProperties) -> RunStyleProperties:
+		"""
+		Copy-on-write patch, the properties defined in other override the ones in a copy of self.
+		:param other: Run style properties patching self.
+		:return: New patched run style properties.
+		"""
+		return self.model_copy(update={
+			field: value for field, value in (
+				("font_size", other.font_size),
+				("font_color", other.font_color),
+				("font_script", other.font_script),
+				("bold", other.bold),
+				("italic", other.italic),
+				("underline", other.underline)
+			) if value is not None
+		})
 
 class Justification(Enum):
 	"""
@@ -282,6 +380,8 @@ class Indentation(ArbitraryBaseModel):
 	|<--start-->|ipsum dolor, sit|<--end-->|
 	|			|amet.           |		   |
 	"""
+	model_config = ConfigDict(frozen=True)
+
 	start: Optional[IndentationValue] = None
 	end: Optional[IndentationValue] = None
 	first: Optional[IndentationValue] = None
@@ -291,25 +391,29 @@ class Indentation(ArbitraryBaseModel):
 		return cls(start=IndentationValue.default(), end=IndentationValue.default(), first=IndentationValue.default())
 
 	@classmethod
-	def from_ooxml(cls, el: Optional[OoxmlElement], must_default: bool=False) -> Optional[Indentation]:
+	def from_ooxml(cls, el: Optional[etreeElement], must_default: bool=False) -> Optional[Indentation]:
 		"""
-
+		Reads the indentation attributes directly from the <w:ind> element attributes.
+		Where <w:start> and <w:end> take precedence over their legacy equivalents <w:left> and <w:right>.
 		"""
-		if el is not None:			
-			first: Optional[float] = IndentationValue.from_ooxml_val(v=el.xpath_query(query="./@w:hanging", singleton=True))
+		if el is not None:
+			namespace: Optional[str] = etree.QName(el).namespace
+			ns: str = f"{{{namespace}}}" if namespace is not None else ""
+			
+			first: Optional[float] = IndentationValue.from_ooxml_val(v=el.get(f"{ns}hanging"))
 			if first is None:
-				first = IndentationValue.from_ooxml_val(
-					v=el.xpath_query(query="./@w:firstLine", singleton=True), must_default=must_default
-				)
+				first = IndentationValue.from_ooxml_val(v=el.get(f"{ns}firstLine"), must_default=must_default)
 			else:
 				first = IndentationValue(-first)
 
+			start: Optional[str] = el.get(f"{ns}start")
+			end: Optional[str] = el.get(f"{ns}end")
 			return cls(
 				start=IndentationValue.from_ooxml_val(
-					v=el.xpath_query(query="./@w:start|./@w:left", singleton=True), must_default=must_default
+					v=start if start is not None else el.get(f"{ns}left"), must_default=must_default
 				),
 				end=IndentationValue.from_ooxml_val(
-					v=el.xpath_query(query="./@w:end|./@w:right", singleton=True), must_default=must_default
+					v=end if end is not None else el.get(f"{ns}right"), must_default=must_default
 				),
 				first=first
 			)
@@ -321,9 +425,17 @@ class Indentation(ArbitraryBaseModel):
 
 
 class ParagraphStyleProperties(ArbitraryBaseModel):
+	model_config = ConfigDict(frozen=True)
+
 	justification: Optional[Justification] = None
 	indentation: Indentation = Indentation()
 
+	# Supported <w:pPr> children: local name -> (field, raw value extractor)
+	_OOXML_DISPATCH_TABLE: ClassVar[dict[str, tuple[str, OoxmlChildExtractor]]] = {
+		"jc": ("justification", _extract_val),
+		"ind": ("indentation", _extract_element)
+	}
+
 	@classmethod
 	def default(cls) -> RunStyleProperties:
 		return cls(justification=Justification.default(), indentation=Indentation().default())
@@ -333,13 +445,12 @@ class ParagraphStyleProperties(ArbitraryBaseModel):
 		cls, paragraph_properties: Optional[OOXML_PROPERTIES.ParagraphProperties], must_default: bool=False
 	) -> ParagraphStyleProperties:
 		if paragraph_properties is not None:
+			values: dict[str, Any] = _extract_ooxml_children(
+				el=paragraph_properties.element, dispatch_table=cls._OOXML_DISPATCH_TABLE
+			)
 			return cls(
-				justification=Justification.from_ooxml_val(
-					v=paragraph_properties.xpath_query(query="./w:jc/@w:val", singleton=True), must_default=must_default
-				),
-				indentation=Indentation.from_ooxml(
-					el=paragraph_properties.xpath_query(query="./w:ind", singleton=True), must_default=must_default
-				)
+				justification=Justification.from_ooxml_val(v=values.get("justification"), must_default=must_default),
+				indentation=Indentation.from_ooxml(el=values.get("indentation"), must_default=must_default)
 			)
 	
 		if must_default:
@@ -347,6 +458,18 @@ class ParagraphStyleProperties(ArbitraryBaseModel):
 		
 		return cls()
 	
+	@property
+	def deduplication_key(self) -> tuple:
+		"""
+		Canonical hashable key, two paragraph style properties are equal if and only if their keys are equal.
+		"""
+		return (
+			self.justification,
+			self.indentation.start,
+			self.indentation.end,
+			self.indentation.first
+		)
+
 	@classmethod
 	def aggregate_ooxml(cls, agg: ParagraphStyleProperties, add: ParagraphStyleProperties) -> ParagraphStyleProperties:
 		return cls(
@@ -410,7 +533,12 @@ class StyleProperties(ArbitraryBaseModel):
 	 - justification:
 	 - indentation:
 	! TODO: Paragraph properties can also contain run properties, need to take this into account
+
+	Style properties (and all of their nested properties) are immutable, since they are shared between effective styles.
+	Use derive to obtain a modified copy.
 	"""
+	model_config = ConfigDict(frozen=True)
+
 	run_style_properties: RunStyleProperties
 	paragraph_style_properties: ParagraphStyleProperties
 
@@ -421,8 +549,34 @@ class StyleProperties(ArbitraryBaseModel):
 		cls,
 		run_properties: Optional[OOXML_PROPERTIES.RunProperties]=None,
 		paragraph_properties: Optional[OOXML_PROPERTIES.ParagraphProperties]=None,
-		must_default: bool=False
+		must_default: bool=False,
+		memo: Optional[dict[tuple, StyleProperties]]=None
 	) -> StyleProperties:
+		"""
+		Extracts the style properties from the OOXML run and paragraph properties elements.
+		
+		When a memo is given, the result is shared between all the properties elements with the same fingerprint
+		 (see ooxml_fingerprint), so the returned instance must be treated as immutable.
+
+		:param run_properties: OOXML run properties element.
+		:param paragraph_properties: OOXML paragraph properties element.
+		:param must_default: Boolean indicating whether missing properties should take their default value.
+		:param memo: Optional dictionary of previously extracted style properties keyed by fingerprint.
+		:return: Extracted style properties.
+		"""
+		if memo is not None:
+			fingerprint: tuple = cls.ooxml_fingerprint(
+				run_properties=run_properties, paragraph_properties=paragraph_properties, must_default=must_default
+			)
+			style_properties: Optional[StyleProperties] = memo.get(fingerprint)
+			if style_properties is None:
+				style_properties = cls.from_ooxml(
+					run_properties=run_properties, paragraph_properties=paragraph_properties, must_default=must_default
+				)
+				memo[fingerprint] = style_properties
+			
+			return style_properties
+
 		return cls(
 			run_style_properties=RunStyleProperties.from_ooxml(
 				run_properties=run_properties, must_default=must_default
@@ -432,6 +586,59 @@ class StyleProperties(ArbitraryBaseModel):
 			)
 		)
 
+	@staticmethod
+	def ooxml_fingerprint(
+		run_properties: Optional[OOXML_PROPERTIES.RunProperties]=None,
+		paragraph_properties: Optional[OOXML_PROPERTIES.ParagraphProperties]=None,
+		must_default: bool=False
+	) -> tuple:
+		"""
+		Canonical fingerprint of the OOXML run and paragraph properties elements,
+		 two pairs of elements with the same fingerprint always result in the same style properties.
+		:return: Hashable fingerprint.
+		"""
+		return (
+			_fingerprint_ooxml_children(
+				el=run_properties.element if run_properties is not None else None,
+				dispatch_table=RunStyleProperties._OOXML_DISPATCH_TABLE
+			),
+			_fingerprint_ooxml_children(
+				el=paragraph_properties.element if paragraph_properties is not None else None,
+				dispatch_table=ParagraphStyleProperties._OOXML_DISPATCH_TABLE
+			),
+			must_default
+		)
+
+	@property
+	def deduplication_key(self) -> tuple:
+		"""
+		Canonical hashable key, two style properties are equal if and only if their keys are equal.
+		Allows grouping equal style properties through hashing instead of pairwise comparisons.
+		"""
+		return (
+			self.run_style_properties.deduplication_key,
+			self.paragraph_style_properties.deduplication_key,
+			# Table style properties are not computed yet, fallback to its representation
+			repr(self.table_style_properties) if self.table_style_properties is not None else None
+		)
+
+	def derive(
+		self,
+		run_style_properties: Optional[RunStyleProperties]=None,
+		paragraph_style_properties: Optional[ParagraphStyleProperties]=None
+	) -> StyleProperties:
+		"""
+		Copy-on-write update of the style properties.
+		:return: New style properties with the given run and/or paragraph style properties replaced.
+		"""
+		update: dict[str, Any] = {}
+		if run_style_properties is not None:
+			update["run_style_properties"] = run_style_properties
+		if paragraph_style_properties is not None:
+			update["paragraph_style_properties"] = paragraph_style_properties
+		
+		return self.model_copy(update=update)
+
 	@classmethod
 	def aggregate_ooxml(cls, agg: StyleProperties, add: StyleProperties, default: StyleProperties) -> StyleProperties:
 		return cls(
@@ -449,7 +656,11 @@ class Style(ArbitraryBaseModel):
 	To simplify style management and processing, generalizes the concept of a style given to a block,
 	Gathering all the relevant properties from the different OOXML style types that have an effect from a block viewpoint,
 	both at a paragraph and character level properties (<w:pPr> and <w:rPr>).
+
+	Effective styles are immutable so they can be shared instead of copied, use derive to obtain a modified copy.
 	"""
+	model_config = ConfigDict(frozen=True)
+
 	id: str
 	
 	parent: Optional[Style] = None
@@ -462,6 +673,21 @@ class Style(ArbitraryBaseModel):
 			return self.properties == v.properties
 		
 		raise ValueError("") # TODO
+	
+	def derive(self, id: Optional[str]=None, properties: Optional[StyleProperties]=None) -> Style:
+		"""
+		Copy-on-write update of the style.
+		:param id: New style id, defaults to the current one.
+		:param properties: New style properties, defaults to the current ones.
+		:return: New style with the given fields replaced.
+		"""
+		update: dict[str, Any] = {}
+		if id is not None:
+			update["id"] = id
+		if properties is not None:
+			update["properties"] = properties
+		
+		return self.model_copy(update=update)
 
 
 class StylesView(ArbitraryBaseModel):
@@ -478,20 +704,32 @@ class StylesView(ArbitraryBaseModel):
 			}
 		)
 
-	@property
+	@cached_property
 	def priorities(self) -> dict[int, list[Style]]:
 		return {
 			priority: [self.styles[style_id] for style_id in styles_keys]
 			for priority, styles_keys in self.priority_keys.items()
 		}
 	
-	def _find_priority(self, style: Style) -> int:
-		# TODO make it cleaner
+	@cached_property
+	def priority_ranks(self) -> dict[str, int]:
+		"""
+		Inverted priority keys, precomputed style id -> priority map for constant time priority lookups.
+		If a style id is found in more than one priority, the first one is kept.
+		"""
+		ranks: dict[str, int] = {}
 		for priority, style_ids_in_priority in self.priority_keys.items():
-			if style.id in style_ids_in_priority:
-				return priority
+			for style_id in style_ids_in_priority:
+				ranks.setdefault(style_id, priority)
+		
+		return ranks
+
+	def _find_priority(self, style: Style) -> int:
+		priority: Optional[int] = self.priority_ranks.get(style.id)
+		if priority is None:
+			raise KeyError("") # TODO
 		
-		raise KeyError("") # TODO
+		return priority
 	
 	def priority_difference(self, curr_style: Style, prev_style: Style) -> int:
 		match self._find_priority(style=curr_style) - self._find_priority(style=prev_style):
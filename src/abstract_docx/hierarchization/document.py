@@ -1,11 +1,11 @@
 from __future__ import annotations
-from typing import Optional
+from typing import Optional, Iterable
 from enum import Enum
 
 from utils.pydantic import ArbitraryBaseModel
 
 from abstract_docx.data_models.styles import StylesView, Style, StyleProperties
-from abstract_docx.data_models.numberings import NumberingsView
+from abstract_docx.data_models.numberings import NumberingsView, Index, ImpliedIndex
 from abstract_docx.data_models.document import Block, Paragraph
 
 from abstract_docx.normalization import EffectiveStructureFromOoxml
@@ -21,6 +21,25 @@ class HierarchizationConflictResolution(Enum):
 DEFAULT_HIERARCHIZATION_CONFLICT_RESOLUTION: HierarchizationConflictResolution = HierarchizationConflictResolution.UNBOUNDED
 
 
+class _BlockRanks:
+	"""
+	Priority ranks of a block, used to compare it with other blocks during the hierarchization.
+	The level style rank is only resolved when two blocks tie on their style rank, since it is not needed otherwise.
+	"""
+	__slots__ = ("style_rank", "index", "_level_rank")
+
+	def __init__(self, style_rank: int, index: Optional[Index | ImpliedIndex]) -> None:
+		self.style_rank: int = style_rank
+		self.index: Optional[Index | ImpliedIndex] = index  # Index (or implied index) of the block
+		self._level_rank: Optional[int] = None
+
+	def level_rank(self, styles_view: StylesView) -> int:
+		if self._level_rank is None:
+			self._level_rank = styles_view._find_priority(style=self.index.level.style)
+
+		return self._level_rank
+
+
 class HierarchicalDocumentFromOoxml(ArbitraryBaseModel):
 	root: Block
 
@@ -76,83 +95,123 @@ class HierarchicalDocumentFromOoxml(ArbitraryBaseModel):
 
 		return hierarchical_document_from_ooxml
 	
-	def _traverse(self, curr_block: Block, prev_block: Block) -> None:
+	def _block_ranks(self, block: Block) -> _BlockRanks:
+		"""
+		Precomputes the priority ranks of the block needed to compare it with other blocks.
+		:param block: Block (must not be the root block).
+		:return: Priority ranks of the block.
+		"""
+		return _BlockRanks(
+			style_rank=self.styles_view._find_priority(style=block.format.style),
+			index=block.format.index if block.format.index is not None else block.format.implied_index
+		)
+
+	@staticmethod
+	def _rank_difference(curr_rank: int, prev_rank: int) -> int:
+		"""
+		Same convention as the views priority difference:
+		 1 if current has higher priority (lower rank), 0 if equal and -1 if current has lower priority.
+		"""
+		if curr_rank == prev_rank:
+			return 0
+		
+		return 1 if curr_rank < prev_rank else -1
+
+	def _priority_difference(
+		self,
+		curr_block: Block,
+		curr_ranks: _BlockRanks,
+		prev_block: Block,
+		prev_ranks: Optional[_BlockRanks]
+	) -> int:
+		"""
+		Computes the priority difference between the current block and a previous block (the previous block or one of its ancestors).
+		:return: 1 if the current block has higher priority, 0 if the same priority and -1 if lower priority.
+		"""
 		# TODO: implicit_index_matches
+		if prev_block.id == -1:
+			return -1
 
-		total_priority_difference: int = -1
-		if prev_block.id != -1:
-			indexes_present: bool = (
-				(curr_block.format.index is not None or curr_block.format.implied_index is not None)
-				and (prev_block.format.index is not None or prev_block.format.implied_index is not None)
-			)
-			shared_numbering: bool = (
-				indexes_present 
-				and (
-					curr_block.format.index is None or prev_block.format.index is None
-					or (
-						curr_block.format.index is not None and prev_block.format.index is not None
-						and curr_block.format.index.numbering == prev_block.format.index.numbering
-					)
-				)
+		curr_index: Optional[Index | ImpliedIndex] = (
+			curr_block.format.index if curr_block.format.index is not None else curr_block.format.implied_index
+		)
+		prev_index: Optional[Index | ImpliedIndex] = (
+			prev_block.format.index if prev_block.format.index is not None else prev_block.format.implied_index
+		)
+		
+		indexes_present: bool = curr_index is not None and prev_index is not None
+		shared_numbering: bool = (
+			indexes_present 
+			and (
+				curr_block.format.index is None or prev_block.format.index is None
+				or curr_block.format.index.numbering == prev_block.format.index.numbering
 			)
+		)
 
-			styles_priority_difference: int = self.styles_view.priority_difference(
-				curr_style=curr_block.format.style, prev_style=prev_block.format.style
+		styles_priority_difference: int = self._rank_difference(
+			curr_rank=curr_ranks.style_rank, prev_rank=prev_ranks.style_rank
+		)
+		if indexes_present and styles_priority_difference == 0:
+			styles_priority_difference = self._rank_difference(
+				curr_rank=curr_ranks.level_rank(styles_view=self.styles_view),
+				prev_rank=prev_ranks.level_rank(styles_view=self.styles_view)
 			)
-			if indexes_present and styles_priority_difference == 0:
-				styles_priority_difference = self.styles_view.priority_difference(
-					curr_style=(
-						curr_block.format.index.level.style if curr_block.format.index is not None
-						else curr_block.format.implied_index.level.style
-					),
-					prev_style=(
-						prev_block.format.index.level.style if prev_block.format.index is not None
-						else prev_block.format.implied_index.level.style
-					)
-				)
-
-			if shared_numbering:
-				numberings_priority_difference: int = self.numberings_view.priority_difference(
-					curr_index=(
-						curr_block.format.index if curr_block.format.index is not None
-						else curr_block.format.implied_index
-					),
-					prev_index=(
-						prev_block.format.index if prev_block.format.index is not None
-						else prev_block.format.implied_index
-					)
-				)
-				
-				if (
-					self.hierarchization_conflict_resolution == HierarchizationConflictResolution.BOUNDED
-					and styles_priority_difference != 0 and numberings_priority_difference != 0
-					and styles_priority_difference == -numberings_priority_difference
-				):
-					raise ValueError("") # TODO
-				total_priority_difference = numberings_priority_difference				
-			else:
-				total_priority_difference = styles_priority_difference
-
-		match total_priority_difference:
-			case 0:
-				# Shared parent
-				prev_block.parent.children.append(curr_block)
-				curr_block.parent = prev_block.parent
-			case 1:
-				# Traverse with parent
-				self._traverse(curr_block=curr_block, prev_block=prev_block.parent)
-			case -1:
-				# Child
-				if prev_block.children is None:
-					prev_block.children = [curr_block]
-				else:
-					prev_block.children.append(curr_block)
-				curr_block.parent = prev_block
+
+		if not shared_numbering:
+			return styles_priority_difference
 		
-	def compute(self) -> None:
-		prev_block: Block = self.root
-		for block in self.effective_structure_from_ooxml.document.effective_document.values():
-			self._traverse(curr_block=block, prev_block=prev_block)
-			prev_block: Block = block
+		numberings_priority_difference: int = self.numberings_view.priority_difference(
+			curr_index=curr_index, prev_index=prev_index
+		)
+		if (
+			self.hierarchization_conflict_resolution == HierarchizationConflictResolution.BOUNDED
+			and styles_priority_difference != 0 and numberings_priority_difference != 0
+			and styles_priority_difference == -numberings_priority_difference
+		):
+			raise ValueError("") # TODO
+		
+		return numberings_priority_difference
 
+	@staticmethod
+	def _append_child(parent_block: Block, child_block: Block) -> None:
+		if parent_block.children is None:
+			parent_block.children = [child_block]
+		else:
+			parent_block.children.append(child_block)
+		child_block.parent = parent_block
+
+	def _hierarchize(self, blocks: Iterable[Block]) -> None:
+		"""
+		Iterative hierarchization of the blocks below the root block.
+		Keeps a stack with the open ancestors (the path from the root to the previous block) and their precomputed ranks.
+		Each block climbs the stack popping every ancestor with lower priority,
+		 and it is attached as a sibling (same priority) or as a child (higher priority) of the remaining top of the stack.
+		Since every block is pushed and popped at most once, each block is attached in amortized constant time.
+		:param blocks: Blocks in document order.
+		"""
+		open_ancestors: list[tuple[Block, Optional[_BlockRanks]]] = [(self.root, None)]
+		for curr_block in blocks:
+			curr_ranks: _BlockRanks = self._block_ranks(block=curr_block)
+
+			while True:
+				prev_block, prev_ranks = open_ancestors[-1]
+				match self._priority_difference(
+					curr_block=curr_block, curr_ranks=curr_ranks, prev_block=prev_block, prev_ranks=prev_ranks
+				):
+					case 0:
+						# Shared parent
+						open_ancestors.pop()
+						self._append_child(parent_block=open_ancestors[-1][0], child_block=curr_block)
+						break
+					case 1:
+						# Climb to the parent
+						open_ancestors.pop()
+					case -1:
+						# Child
+						self._append_child(parent_block=prev_block, child_block=curr_block)
+						break
+			
+			open_ancestors.append((curr_block, curr_ranks))
 
+	def compute(self) -> None:
+		self._hierarchize(blocks=self.effective_structure_from_ooxml.document.effective_document.values())
@@ -1,6 +1,8 @@
 from __future__ import annotations
 from typing import Optional
 from enum import Enum
+from itertools import groupby
+from functools import cached_property
 
 from utils.pydantic import ArbitraryBaseModel
 
@@ -98,54 +100,35 @@ class HierarchicalNumberingsFromOoxml(ArbitraryBaseModel):
 
 		return hierarchical_numberings_from_ooxml
 	
-	def compute_priority_difference(self, level: Level, level_priority_representative: Level) -> int:
+	def compute_priority_key(self, level: Level) -> tuple[int, int]:
 		"""
-		Returns -1 if level has lower priority than the level priority representative
-		Returns 0 if level has the same priority as the level priority representative
-		Returns 1 if level has higher priority than the level priority representative
+		Comparison key of the level, where a lower key means a higher priority.
+		Given first by the position of its marker type in the numberings priority parameters
+		 (marker types not included in the parameters have the lowest priority),
+		 and then by the priority of its style.
 		"""
-
 		# TODO: If two levels are from the same enumeration, the priority difference should be given by their position in the enumeration
-		for priority in self.numberings_priority_parameters:
-			priority: MarkerType = MarkerType(priority.value)
-			
-			if (
-				level.properties.marker_type == priority
-				and level_priority_representative.properties.marker_type != priority
-			):
-				return 1
-			if (
-				level.properties.marker_type != priority
-				and level_priority_representative.properties.marker_type == priority
-			):
-				return -1
-			
-		return self.styles_view.priority_difference(
-			curr_style=level.style, prev_style=level_priority_representative.style
+		return (
+			self._marker_type_ranks.get(level.properties.marker_type, len(self._marker_type_ranks)),
+			self.styles_view._find_priority(style=level.style)
 		)
+	
+	@cached_property
+	def _marker_type_ranks(self) -> dict[MarkerType, int]:
+		return {MarkerType(priority.value): rank for rank, priority in enumerate(self.numberings_priority_parameters)}
 
 	def compute(self) -> None:
-		for effective_level in self.effective_structure_from_ooxml.numberings.effective_levels.values():
-			if len(self.priority_ordered_levels) == 0:
-				self.priority_ordered_levels.append([effective_level])
-			else:
-				for i, priority in enumerate(self.priority_ordered_levels):
-					priority_difference: int = self.compute_priority_difference(
-						level=effective_level, level_priority_representative=priority[0]
-					)
-
-					match priority_difference:
-						case -1:
-							# Continue searching for equal or lower priority (if possible)
-							if i == len(self.priority_ordered_levels) - 1:
-								self.priority_ordered_levels.append([effective_level])
-						case 0:
-							# Insert level into the current priority level (and stop search)
-							priority.append(effective_level)
-							break
-						case 1:
-							# Insert level one priority level above of the current priority level (and stop search)
-							self.priority_ordered_levels.insert(i, [effective_level])
-							break
-	
-		
\ No newline at end of file
+		"""
+		Groups the effective levels into priority levels, by sorting them through their priority key.
+		The sort is stable, so levels inside the same priority level keep their effective levels order.
+		"""
+		keyed_levels: list[tuple[tuple[int, int], Level]] = [
+			(self.compute_priority_key(level=effective_level), effective_level)
+			for effective_level in self.effective_structure_from_ooxml.numberings.effective_levels.values()
+		]
+		keyed_levels.sort(key=lambda keyed_level: keyed_level[0])
+
+		self.priority_ordered_levels = [
+			[level for _, level in levels_in_priority]
+			for _, levels_in_priority in groupby(keyed_levels, key=lambda keyed_level: keyed_level[0])
+		]
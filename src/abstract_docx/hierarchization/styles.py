@@ -1,6 +1,7 @@
 from __future__ import annotations
 from typing import Optional
 from enum import Enum
+from itertools import groupby
 
 from utils.pydantic import ArbitraryBaseModel
 
@@ -69,76 +70,42 @@ class HierarchicalStylesFromOoxml(ArbitraryBaseModel):
 
 		return hierarchical_styles_from_ooxml
 
-	def compute_priority_difference(self, style: Style, style_priority_representative: Style) -> int:
+	def compute_priority_key(self, style: Style) -> tuple:
 		"""
-		Returns -1 if style has lower priority than the style priority representative
-		Returns 0 if style has the same priority as the style priority representative
-		Returns 1 if style has higher priority than the style priority representative
+		Comparison key of the style given by the styles priority parameters, where a lower key means a higher priority.
+		Two styles with the same key share the same priority.
+		 - Font size: the bigger the font size the higher the priority.
+		 - Bold: bold styles have higher priority than non bold styles.
+		 - Indentation: the smaller the start indentation the higher the priority.
+		Undefined values are given the lowest priority.
 		"""
-
+		key: list[tuple] = []
 		for priority in self.styles_priority_parameters:
 			match priority:
 				case AvailableStylePriorityParameters.FONT_SIZE:
-					if (
-						style.properties.run_style_properties.font_size 
-						!= style_priority_representative.properties.run_style_properties.font_size
-					):
-						if (
-							style.properties.run_style_properties.font_size 
-							< style_priority_representative.properties.run_style_properties.font_size
-						):
-							return -1
-						
-						return 1
+					font_size: Optional[float] = style.properties.run_style_properties.font_size
+					key.append((0, -font_size) if font_size is not None else (1, 0.0))
 				case AvailableStylePriorityParameters.BOLD:
-					if (
-						style.properties.run_style_properties.bold 
-						!= style_priority_representative.properties.run_style_properties.bold
-					):
-						if (
-							not style.properties.run_style_properties.bold
-							and style_priority_representative.properties.run_style_properties.bold
-						):
-							return -1
-						
-						return 1
+					key.append((0,) if style.properties.run_style_properties.bold else (1,))
 				case AvailableStylePriorityParameters.INDENTATION:
 					# TODO: How to take into account first line indentation
-					if (
-						style.properties.paragraph_style_properties.indentation.start 
-						!= style_priority_representative.properties.paragraph_style_properties.indentation.start
-					):
-						if (
-							style.properties.paragraph_style_properties.indentation.start 
-							> style_priority_representative.properties.paragraph_style_properties.indentation.start
-						):
-							return -1
-						
-						return 1
+					start: Optional[float] = style.properties.paragraph_style_properties.indentation.start
+					key.append((0, start) if start is not None else (1, 0.0))
 		
-		return 0
+		return tuple(key)
 	
 	def compute(self) -> None:
-		for effective_style in self.effective_structure_from_ooxml.styles.effective_styles.values():
-			if len(self.priority_ordered_styles) == 0:
-				self.priority_ordered_styles.append([effective_style])
-			else:
-				for i, priority in enumerate(self.priority_ordered_styles):
-					priority_difference: int = self.compute_priority_difference(
-						style=effective_style, style_priority_representative=priority[0]
-					)
-
-					match priority_difference:
-						case -1:
-							# Continue searching for equal or lower priority (if possible)
-							if i == len(self.priority_ordered_styles) - 1:
-								self.priority_ordered_styles.append([effective_style])
-						case 0:
-							# Insert style into the current priority level (and stop search)
-							priority.append(effective_style)
-							break
-						case 1:
-							# Insert style one priority level above of the current priority level (and stop search)
-							self.priority_ordered_styles.insert(i, [effective_style])
-							break
-	
\ No newline at end of file
+		"""
+		Groups the effective styles into priority levels, by sorting them through their priority key.
+		The sort is stable, so styles inside the same priority level keep their effective styles order.
+		"""
+		keyed_styles: list[tuple[tuple, Style]] = [
+			(self.compute_priority_key(style=effective_style), effective_style)
+			for effective_style in self.effective_structure_from_ooxml.styles.effective_styles.values()
+		]
+		keyed_styles.sort(key=lambda keyed_style: keyed_style[0])
+
+		self.priority_ordered_styles = [
+			[style for _, style in styles_in_priority]
+			for _, styles_in_priority in groupby(keyed_styles, key=lambda keyed_style: keyed_style[0])
+		]
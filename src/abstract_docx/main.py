@@ -1,12 +1,15 @@
 from __future__ import annotations
-from typing import Optional
+from typing import Optional, Iterable, Iterator, AsyncIterator, Callable, TYPE_CHECKING
+from enum import Enum
 import json
 
 from utils.pydantic import ArbitraryBaseModel
 
 from ooxml_docx.docx import OoxmlDocx
+from ooxml_docx.structure.styles import OoxmlStyles
+from ooxml_docx.structure.numberings import OoxmlNumberings
 
-from abstract_docx.normalization import EffectiveStructureFromOoxml
+from abstract_docx.normalization import EffectiveStructureFromOoxml, TemplateCache
 from abstract_docx.hierarchization import HierarchicalStructureFromOoxml
 
 from abstract_docx.data_models import Views
@@ -28,13 +31,27 @@ import logging
 from colorlog import ColoredFormatter
 logger = logging.getLogger(__name__)
 
+if TYPE_CHECKING:
+	# The batch module builds on top of this one
+	from abstract_docx.batch import ReadManyResult
+
+
+class PipelineStage(Enum):
+	OOXML = "ooxml"  # Reading the .docx package and building its OOXML structure
+	NORMALIZATION = "normalization"
+	HIERARCHIZATION = "hierarchization"
+	VIEWS = "views"
+
+
+OnStage = Callable[[PipelineStage], None]
+
 
 class AbstractDocx(ArbitraryBaseModel):
 	"""
 
 	"""
 	file_path: str
-	ooxml_docx: OoxmlDocx
+	ooxml_docx: Optional[OoxmlDocx]  # None once detached (see detach)
 
 	_effective_structure: Optional[EffectiveStructureFromOoxml] = None
 	_hierarchical_structure: Optional[HierarchicalStructureFromOoxml] = None
@@ -52,15 +69,131 @@ class AbstractDocx(ArbitraryBaseModel):
 			handler.setFormatter(formatter)
 
 	@classmethod
-	def read(cls, file_path: str, logging_level: str = "DEBUG", *args, **kwargs) -> AbstractDocx:
+	def read(
+		cls,
+		file_path: str,
+		logging_level: str = "DEBUG",
+		on_stage: Optional[OnStage] = None,
+		template_cache: Optional[TemplateCache] = None,
+		*args,
+		**kwargs
+	) -> AbstractDocx:
+		"""
+		:param file_path: Path of the .docx file.
+		:param logging_level: Logging level, defaults to "DEBUG".
+		:param on_stage: Callback called at the start of each pipeline stage, defaults to None.
+		:param template_cache: Cache of the styles and numberings shared between documents, defaults to None.
+		:return: Abstract representation of the document.
+		"""
+		cls._setup_logger(logging_level=logging_level)
+
+		if on_stage is not None:
+			on_stage(PipelineStage.OOXML)
+		with open(file_path, "rb") as f:
+			content: bytes = f.read()
+
+		return cls._build(
+			content=content, file_path=file_path, on_stage=on_stage, template_cache=template_cache, *args, **kwargs
+		)
+
+	@classmethod
+	def load(
+		cls,
+		content: bytes,
+		file_path: str = "document.docx",
+		logging_level: str = "DEBUG",
+		on_stage: Optional[OnStage] = None,
+		template_cache: Optional[TemplateCache] = None,
+		*args,
+		**kwargs
+	) -> AbstractDocx:
+		"""
+		Same as .read(), but from the raw bytes of the .docx file.
+		:param content: Raw bytes of the .docx file.
+		:param file_path: Path (or name) identifying the document, defaults to "document.docx".
+		:param logging_level: Logging level, defaults to "DEBUG".
+		:param on_stage: Callback called at the start of each pipeline stage, defaults to None.
+		:param template_cache: Cache of the styles and numberings shared between documents, defaults to None.
+		:return: Abstract representation of the document.
+		"""
 		cls._setup_logger(logging_level=logging_level)
 
-		ooxml_docx: OoxmlDocx = OoxmlDocx.read(file_path=file_path)
+		if on_stage is not None:
+			on_stage(PipelineStage.OOXML)
+
+		return cls._build(
+			content=content, file_path=file_path, on_stage=on_stage, template_cache=template_cache, *args, **kwargs
+		)
+
+	@classmethod
+	def _build(
+		cls,
+		content: bytes,
+		file_path: str,
+		on_stage: Optional[OnStage] = None,
+		template_cache: Optional[TemplateCache] = None,
+		*args,
+		**kwargs
+	) -> AbstractDocx:
+		"""
+		Runs the whole pipeline from the raw bytes of the .docx file (the OOXML stage is already notified).
+		"""
+		ooxml_docx: OoxmlDocx = cls._load_ooxml_docx(content=content, file_path=file_path, template_cache=template_cache)
 		abstract_docx: AbstractDocx = cls(file_path=file_path, ooxml_docx=ooxml_docx)
-		abstract_docx._construct(*args, **kwargs)
+		abstract_docx._construct(on_stage=on_stage, template_cache=template_cache, *args, **kwargs)
 
 		return abstract_docx
+
+	@staticmethod
+	def _load_ooxml_docx(content: bytes, file_path: str, template_cache: Optional[TemplateCache] = None) -> OoxmlDocx:
+		"""
+		Unpacks and builds the OOXML docx, reusing the already built styles and numberings of its template if cached.
+		The document body is not built, it is streamed block by block by the normalization (see OoxmlDocx.stream_body),
+		 so the whole document tree is never held in memory.
+		"""
+		ooxml_docx: OoxmlDocx = OoxmlDocx.unpack(content=content, file_path=file_path)
+
+		ooxml_structure: Optional[tuple[OoxmlStyles, OoxmlNumberings]] = (
+			template_cache.ooxml_structure(ooxml_docx=ooxml_docx) if template_cache is not None else None
+		)
+		if ooxml_structure is not None:
+			ooxml_docx.build(load_document=False, styles=ooxml_structure[0], numberings=ooxml_structure[1])
+		else:
+			ooxml_docx.build(load_document=False)
+
+		return ooxml_docx
 	
+	@classmethod
+	def read_many(cls, file_paths: Iterable[str], **kwargs) -> Iterator[ReadManyResult]:
+		"""
+		Reads several documents in parallel with a pool of supervised worker processes (see abstract_docx.batch.read_many).
+		"""
+		# Imported here since the batch module builds on top of this one
+		from abstract_docx.batch import read_many
+
+		return read_many(file_paths=file_paths, **kwargs)
+
+	@classmethod
+	async def aread(cls, source: str | bytes, **kwargs) -> AbstractDocx:
+		"""
+		Reads a document without blocking the event loop (see abstract_docx.aio.aread).
+		Errors are raised as they are, whichever the executor.
+		"""
+		# Imported here since the aio module builds on top of this one
+		from abstract_docx.aio import aread
+
+		return await aread(source=source, **kwargs)
+
+	@classmethod
+	def aread_many(cls, sources: Iterable[str | bytes], **kwargs) -> AsyncIterator[ReadManyResult]:
+		"""
+		Reads several documents concurrently without blocking the event loop (see abstract_docx.aio.aread_many).
+		"""
+		# Imported here since the aio module builds on top of this one
+		from abstract_docx.aio import aread_many
+
+		return aread_many(sources=sources, **kwargs)
+
 	# @property
 	# def effective_structure(self) -> EffectiveStructureFromOoxml:
 	# 	if self._effective_structure is not None:
@@ -82,18 +215,37 @@ class AbstractDocx(ArbitraryBaseModel):
 
 		raise ValueError("Please construct")
 
-	def _construct(self, *args, **kwds) -> None:
+	def _construct(
+		self, template_cache: Optional[TemplateCache] = None, on_stage: Optional[OnStage] = None, *args, **kwds
+	) -> None:
 		"""
 		TODO: Parameterization
+		:param template_cache: Cache of the styles and numberings normalization shared between documents, defaults to None.
+		:param on_stage: Callback called at the start of each pipeline stage, defaults to None.
 		"""
+		if on_stage is not None:
+			on_stage(PipelineStage.NORMALIZATION)
+		self._normalize(template_cache=template_cache)
+		
+		if on_stage is not None:
+			on_stage(PipelineStage.HIERARCHIZATION)
+		self._hierarchize()
+		
+		if on_stage is not None:
+			on_stage(PipelineStage.VIEWS)
+		self._load_views()
 
+	def _normalize(self, template_cache: Optional[TemplateCache] = None) -> None:
 		self._effective_structure: EffectiveStructureFromOoxml = EffectiveStructureFromOoxml.normalization(
-			ooxml_docx=self.ooxml_docx
+			ooxml_docx=self.ooxml_docx, template_cache=template_cache
 		)
+
+	def _hierarchize(self) -> None:
 		self._hierarchical_structure: HierarchicalStructureFromOoxml = HierarchicalStructureFromOoxml.hierarchization(
 			effective_structure_from_ooxml=self._effective_structure
 		)
-		
+
+	def _load_views(self) -> None:
 		self._views: Views = Views.load(
 			effective_structure=self._effective_structure, hierarchical_structure=self._hierarchical_structure
 		)		
@@ -186,19 +338,22 @@ class AbstractDocx(ArbitraryBaseModel):
 		
 		return s
 
-	def to_txt(self, output_file_path: Optional[str]=None) -> None:
+	def to_text(self) -> str:
 		s: str = ""
 		for root in self.views.document.root.children:
 			s += self._to_text(block=root)
 		
+		return s
+
+	def to_txt(self, output_file_path: Optional[str]=None) -> None:
 		output_file_path: str = f"{self.file_path}.txt" if output_file_path is None else output_file_path
 		with open(output_file_path, "w+", encoding="utf-8") as f:
-			f.write(s)
+			f.write(self.to_text())
 
 	def _to_json(self, block: Block) -> dict:
 		data: dict = {"id": block.id}
 
-		if block.format.index.index_ctr is not None:
+		if block.format.index is not None and block.format.index.index_ctr is not None:
 			data["numbering_str"] = block.format.index.enumeration.format(index_ctr=block.format.index.index_ctr)
 		
 		if isinstance(block, Paragraph) or isinstance(block, Table):
@@ -213,19 +368,35 @@ class AbstractDocx(ArbitraryBaseModel):
 		
 		return data
 
-	def to_json(self) -> None:
+	def to_dict(self) -> dict:
 		root_data: dict = {"id": -1, "text": "__ROOT__", "children": []}
 		for child in self.views.document.root.children:
 			root_data["children"].append(self._to_json(block=child))
 
-		json_data = json.dumps(root_data, indent=4)
+		return root_data
+
+	def to_json(self) -> None:
+		json_data = json.dumps(self.to_dict(), indent=4)
 
 		with open(f"{self.file_path}.json", "w+", encoding="utf-8") as f:
 			f.write(json_data)
 
+	def detach(self) -> AbstractDocx:
+		"""
+		Copy of the document only keeping its views, without the OOXML docx (and its lxml trees)
+		 nor the intermediate effective and hierarchical structures, which are much more expensive to pickle.
+		Printing and exporting the detached document (see print, to_text and to_dict) is unaffected.
+		:return: Detached document.
+		"""
+		detached_abstract_docx: AbstractDocx = AbstractDocx(file_path=self.file_path, ooxml_docx=None)
+		detached_abstract_docx._views = self.views
+
+		return detached_abstract_docx
+
 	def to_pickle(self) -> bytes:
 		return gzip.compress(pickle.dumps(self, protocol=pickle.HIGHEST_PROTOCOL))
 	
 	@classmethod
 	def from_pickle(cls, b: bytes) -> AbstractDocx:
 		return pickle.loads(gzip.decompress(b))
+
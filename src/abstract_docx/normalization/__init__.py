@@ -1,4 +1,5 @@
 from __future__ import annotations
+from typing import Optional
 from utils.pydantic import ArbitraryBaseModel
 
 from ooxml_docx.docx import OoxmlDocx
@@ -6,6 +7,7 @@ from ooxml_docx.docx import OoxmlDocx
 from abstract_docx.normalization.styles import EffectiveStylesFromOoxml
 from abstract_docx.normalization.numberings import EffectiveNumberingsFromOoxml
 from abstract_docx.normalization.document import EffectiveDocumentFromOoxml
+from abstract_docx.normalization.cache import TemplateCache
 
 
 class EffectiveStructureFromOoxml(ArbitraryBaseModel):
@@ -14,19 +16,31 @@ class EffectiveStructureFromOoxml(ArbitraryBaseModel):
 	document: EffectiveDocumentFromOoxml
 
 	@classmethod
-	def normalization(cls, ooxml_docx: OoxmlDocx) -> EffectiveStructureFromOoxml:
-		effective_styles_from_ooxml: EffectiveStylesFromOoxml = EffectiveStylesFromOoxml.normalization(
-			ooxml_styles=ooxml_docx.structure.styles
-		)
-		
-		effective_numberings_from_ooxml: EffectiveNumberingsFromOoxml = EffectiveNumberingsFromOoxml.normalization(
-			ooxml_numberings=ooxml_docx.structure.numberings, effective_styles_from_ooxml=effective_styles_from_ooxml
-		)
+	def normalization(
+		cls, ooxml_docx: OoxmlDocx, template_cache: Optional[TemplateCache] = None
+	) -> EffectiveStructureFromOoxml:
+		"""
+		:param ooxml_docx: OOXML docx to normalize.
+		:param template_cache: Cache of the styles and numberings normalization shared between documents, defaults to None.
+		:return: Effective structure of the document.
+		"""
+		if template_cache is not None:
+			effective_styles_from_ooxml, effective_numberings_from_ooxml = template_cache.normalization(ooxml_docx=ooxml_docx)
+		else:
+			effective_styles_from_ooxml: EffectiveStylesFromOoxml = EffectiveStylesFromOoxml.normalization(
+				ooxml_styles=ooxml_docx.structure.styles
+			)
+			
+			effective_numberings_from_ooxml: EffectiveNumberingsFromOoxml = EffectiveNumberingsFromOoxml.normalization(
+				ooxml_numberings=ooxml_docx.structure.numberings, effective_styles_from_ooxml=effective_styles_from_ooxml
+			)
 		
+		# Documents built without their body (see OoxmlDocx.build) are normalized block by block while streaming it
 		effective_document_from_ooxml: EffectiveDocumentFromOoxml = EffectiveDocumentFromOoxml.normalization(
 			ooxml_document=ooxml_docx.structure.document,
 			effective_styles_from_ooxml=effective_styles_from_ooxml,
-			effective_numberings_from_ooxml=effective_numberings_from_ooxml
+			effective_numberings_from_ooxml=effective_numberings_from_ooxml,
+			ooxml_body=ooxml_docx.stream_body() if ooxml_docx.structure.document is None else None
 		)
 		
 		return cls(
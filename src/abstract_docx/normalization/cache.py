@@ -0,0 +1,169 @@
+from __future__ import annotations
+from typing import Optional
+from collections import OrderedDict
+import os
+import threading
+
+from pydantic import PrivateAttr
+
+from utils.pydantic import ArbitraryBaseModel
+
+from ooxml_docx.ooxml import OoxmlPart
+from ooxml_docx.docx import OoxmlDocx
+from ooxml_docx.structure.styles import OoxmlStyles
+from ooxml_docx.structure.numberings import OoxmlNumberings
+
+from abstract_docx.normalization.styles import EffectiveStylesFromOoxml
+from abstract_docx.normalization.numberings import EffectiveNumberingsFromOoxml
+
+import dill as pickle
+from utils.pickle import register_picklers
+register_picklers()
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+# Bump whenever the normalized styles or numberings data models change, so stale on disk entries are ignored
+_TEMPLATE_CACHE_VERSION: int = 2
+
+TemplateKey = tuple[str, str]  # (styles part content hash, numberings part content hash)
+TemplateEntry = tuple[EffectiveStylesFromOoxml, EffectiveNumberingsFromOoxml]  # Detached from the OOXML (see detach)
+TemplateOoxmlStructure = tuple[OoxmlStyles, OoxmlNumberings]
+
+
+class TemplateCache(ArbitraryBaseModel):
+	"""
+	Cache of the normalized styles and numberings of a .docx template, shared between documents of the same template.
+	Keyed by the content hashes of the raw styles and numberings parts, so only byte identical parts are reused.
+	Kept in memory with LRU eviction and optionally persisted on disk (one pickle file per template).
+
+	Cached entries are detached from the OOXML styles and numberings they were normalized from,
+	 and are never handed out directly, each document gets a fork (see EffectiveStylesFromOoxml.fork),
+	 since the document normalization extends the effective styles and levels.
+	The built OOXML styles and numberings of the in memory templates are also kept (read only),
+	 so documents of an already seen template skip building them (see ooxml_structure).
+	Can be shared between threads (e.g. see abstract_docx.aio), a template may still be normalized more than once
+	 if several of its documents miss the cache at the same time.
+	"""
+	maxsize: int = 128
+	directory: Optional[str] = None
+
+	_entries: OrderedDict[TemplateKey, TemplateEntry] = PrivateAttr(default_factory=OrderedDict)
+	_ooxml_structures: dict[TemplateKey, TemplateOoxmlStructure] = PrivateAttr(default_factory=dict)
+	_lock: threading.RLock = PrivateAttr(default_factory=threading.RLock)
+	hits: int = 0
+	misses: int = 0
+
+	@staticmethod
+	def key(ooxml_docx: OoxmlDocx) -> TemplateKey:
+		"""
+		Should be computed before the styles and numberings parts are parsed, so they are hashed from their raw content.
+		Otherwise they are hashed from their parsed trees (with a warning), so the same template gets a different key
+		 than documents whose key was computed before parsing (e.g. persisted entries are missed).
+		"""
+		ooxml_styles_part: OoxmlPart = ooxml_docx.ooxml.content["word"].content["styles.xml"]
+		ooxml_numbering_part: OoxmlPart = ooxml_docx.ooxml.content["word"].content["numbering.xml"]
+		if not (ooxml_styles_part.is_raw_content_hashable and ooxml_numbering_part.is_raw_content_hashable):
+			logger.warning(
+				f"Template cache key of {ooxml_docx.file_path} computed after parsing its styles or numberings, "
+				"it will not match the key of the same template computed from the raw parts (see OoxmlDocx.unpack)."
+			)
+
+		return ooxml_styles_part.content_hash, ooxml_numbering_part.content_hash
+
+	def _file_path(self, key: TemplateKey) -> str:
+		return os.path.join(self.directory, f"{_TEMPLATE_CACHE_VERSION}-{key[0][:32]}-{key[1][:32]}.pkl")
+
+	def _get(self, key: TemplateKey) -> Optional[TemplateEntry]:
+		with self._lock:
+			entry: Optional[TemplateEntry] = self._entries.get(key)
+			if entry is not None:
+				self._entries.move_to_end(key)
+				return entry
+		
+			if self.directory is not None and os.path.exists(self._file_path(key=key)):
+				try:
+					with open(self._file_path(key=key), "rb") as f:
+						entry = pickle.load(f)
+				except Exception as e:
+					logger.warning(f"Could not load cached template {key=}: {e}")
+					return None
+			
+				self._put(key=key, entry=entry, persist=False)
+		
+			return entry
+
+	def _put(self, key: TemplateKey, entry: TemplateEntry, persist: bool = True) -> None:
+		with self._lock:
+			self._entries[key] = entry
+			self._entries.move_to_end(key)
+			while len(self._entries) > self.maxsize:
+				evicted_key, _ = self._entries.popitem(last=False)
+				self._ooxml_structures.pop(evicted_key, None)
+
+			if persist and self.directory is not None:
+				os.makedirs(self.directory, exist_ok=True)
+				# Write to a temporary file first, so that concurrent readers never see a partially written entry
+				tmp_file_path: str = f"{self._file_path(key=key)}.{os.getpid()}.tmp"
+				with open(tmp_file_path, "wb") as f:
+					pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+				os.replace(tmp_file_path, self._file_path(key=key))
+
+	def clear(self) -> None:
+		"""
+		Evicts every in memory entry (on disk entries are kept).
+		"""
+		with self._lock:
+			self._entries.clear()
+			self._ooxml_structures.clear()
+
+	def ooxml_structure(self, ooxml_docx: OoxmlDocx) -> Optional[TemplateOoxmlStructure]:
+		"""
+		Built OOXML styles and numberings of the document template, if it is already in memory.
+		:param ooxml_docx: Unpacked OOXML docx, whose structure is not built yet (see OoxmlDocx.unpack).
+		:return: Shared OOXML styles and numberings (must not be modified), None if the template was not seen yet.
+		"""
+		with self._lock:
+			return self._ooxml_structures.get(self.key(ooxml_docx=ooxml_docx))
+
+	def normalization(self, ooxml_docx: OoxmlDocx) -> TemplateEntry:
+		"""
+		Normalized styles and numberings of the document, reused from the cache if its template was already normalized.
+		:param ooxml_docx: OOXML docx whose styles and numberings are normalized.
+		:return: Effective styles and numberings (forked, so the document normalization can extend them).
+		"""
+		key: TemplateKey = self.key(ooxml_docx=ooxml_docx)
+
+		entry: Optional[TemplateEntry] = self._get(key=key)
+		if entry is None:
+			with self._lock:
+				self.misses += 1
+			
+			effective_styles_from_ooxml: EffectiveStylesFromOoxml = EffectiveStylesFromOoxml.normalization(
+				ooxml_styles=ooxml_docx.structure.styles
+			)
+			effective_numberings_from_ooxml: EffectiveNumberingsFromOoxml = EffectiveNumberingsFromOoxml.normalization(
+				ooxml_numberings=ooxml_docx.structure.numberings, effective_styles_from_ooxml=effective_styles_from_ooxml
+			)
+			detached_effective_styles_from_ooxml: EffectiveStylesFromOoxml = effective_styles_from_ooxml.detach()
+			entry = (
+				detached_effective_styles_from_ooxml,
+				effective_numberings_from_ooxml.detach(effective_styles_from_ooxml=detached_effective_styles_from_ooxml)
+			)
+			self._put(key=key, entry=entry)
+		else:
+			with self._lock:
+				self.hits += 1
+			logger.debug(f"Reusing cached template normalization {key=}")
+		
+		with self._lock:
+			if key in self._entries:
+				self._ooxml_structures.setdefault(key, (ooxml_docx.structure.styles, ooxml_docx.structure.numberings))
+
+		forked_effective_styles_from_ooxml: EffectiveStylesFromOoxml = entry[0].fork()
+		forked_effective_numberings_from_ooxml: EffectiveNumberingsFromOoxml = entry[1].fork(
+			effective_styles_from_ooxml=forked_effective_styles_from_ooxml
+		)
+
+		return forked_effective_styles_from_ooxml, forked_effective_numberings_from_ooxml
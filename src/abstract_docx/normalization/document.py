@@ -1,7 +1,6 @@
 from __future__ import annotations
-from typing import Optional
-
-import re
+from typing import Optional, Iterable
+import heapq
 		
 
 import ooxml_docx.document.paragraph as OOXML_PARAGRAPH
@@ -15,14 +14,20 @@ from abstract_docx.data_models.document import Paragraph, Run, Block, Hyperlink,
 
 import ooxml_docx.document.run as OOXML_RUN
 from abstract_docx.data_models.document import Format
-from abstract_docx.data_models.numberings import Level, Numbering, Enumeration, Index, LevelProperties, MarkerType, ImpliedIndex
+from abstract_docx.data_models.numberings import (
+	Level, Numbering, Enumeration, Index, IndexCounters, LevelProperties, MarkerType, ImpliedIndex, EnumerationsDetector
+)
 
 from ooxml_docx.structure.document import OoxmlDocument
+from ooxml_docx.structure.numberings import Numbering as OoxmlNumbering
 from utils.pydantic import ArbitraryBaseModel
 
+import logging
+logger = logging.getLogger(__name__)
+
 
 class EffectiveDocumentFromOoxml(ArbitraryBaseModel):
-	ooxml_document: OoxmlDocument
+	ooxml_document: Optional[OoxmlDocument]  # None when the body is streamed (see normalization)
 	effective_document: dict[int, Block]
 
 	effective_styles_from_ooxml: EffectiveStylesFromOoxml
@@ -31,29 +36,80 @@ class EffectiveDocumentFromOoxml(ArbitraryBaseModel):
 	_computed_numberings_index_ctr: dict[int, dict[int, Optional[int]]] = {}
 	_instantiated_enumerations: set[int] = set()
 	_effective_paragraphs_implied_index_matches_map: dict[int, dict[str, ImpliedIndex]] = {}
+	# Style properties of the direct formatting, shared between repeated OOXML properties elements (see StyleProperties.from_ooxml)
+	_style_properties_memo: dict[tuple, StyleProperties] = {}
+	# Effective run styles shared between runs with the same (effective paragraph style, run style, direct formatting)
+	_effective_run_styles_cache: dict[tuple, Style] = {}
+	# OOXML body blocks to normalize (consumed by _compute_effective_blocks)
+	_ooxml_body: Optional[Iterable[OOXML_PARAGRAPH.Paragraph | OOXML_TABLE.Table]] = None
+	# OOXML numbering and indentation level of the numbered blocks, kept since streamed OOXML blocks are released
+	_ooxml_block_numberings: dict[int, tuple[OoxmlNumbering, int]] = {}
 
 	# Parameters
 	# TODO: parameterize in the input of normalization()
 	_allow_partial_implied_index_matches: bool = True
+	# Maximum number of implied index resolution states kept per paragraph (see _resolve_implied_indexes)
+	_max_implied_index_states: int = 64
 
 	@classmethod
 	def normalization(
 		cls,
-		ooxml_document: OoxmlDocument,
+		ooxml_document: Optional[OoxmlDocument],
 		effective_styles_from_ooxml: EffectiveStylesFromOoxml,
-		effective_numberings_from_ooxml: EffectiveNumberingsFromOoxml
+		effective_numberings_from_ooxml: EffectiveNumberingsFromOoxml,
+		ooxml_body: Optional[Iterable[OOXML_PARAGRAPH.Paragraph | OOXML_TABLE.Table]] = None
 	) -> EffectiveDocumentFromOoxml:
+		"""
+		:param ooxml_document: Built OOXML document, None if its body is streamed instead.
+		:param effective_styles_from_ooxml: Effective styles of the document.
+		:param effective_numberings_from_ooxml: Effective numberings of the document.
+		:param ooxml_body: OOXML body blocks (e.g. OoxmlDocx.stream_body), defaults to None (the OOXML document body).
+		 Each block is fully normalized before the next one is requested, so streamed blocks can be released.
+		:return: Effective document.
+		"""
+		if ooxml_document is None and ooxml_body is None:
+			raise ValueError("Either the OOXML document or its body blocks must be given.")
+
 		effective_document_from_ooxml: EffectiveDocumentFromOoxml = cls(
 			ooxml_document=ooxml_document,
 			effective_document={},
 			effective_styles_from_ooxml=effective_styles_from_ooxml,
 			effective_numberings_from_ooxml=effective_numberings_from_ooxml
 		)
+		effective_document_from_ooxml._ooxml_body = ooxml_body if ooxml_body is not None else ooxml_document.body
 		effective_document_from_ooxml.load()
 
 		return effective_document_from_ooxml
 	
-	def compute_effective_run(self, ooxml_run: OOXML_RUN.Run, effective_paragraph_style: Style, run_id_str: str) -> Run:
+	def compute_effective_run(
+			self,
+			ooxml_run: OOXML_RUN.Run,
+			effective_paragraph_style: Style,
+			run_id_str: str,
+			effective_paragraph_style_key: Optional[tuple] = None
+		) -> Run:
+		"""
+		Computes the effective run, where its effective style is the aggregation of the effective paragraph style,
+		 the run style and the run direct formatting.
+
+		When the key of the effective paragraph style is given (see _effective_paragraph_style_key),
+		 the effective run style is cached and shared between all the runs with the same style and direct formatting.
+		Therefore, the effective run style keeps the id of the first run it was computed for.
+		"""
+		if ooxml_run.style is None and ooxml_run.properties is None:
+			return Run.from_ooxml(ooxml_run=ooxml_run, style=effective_paragraph_style)
+		
+		effective_run_style_key: Optional[tuple] = None
+		if effective_paragraph_style_key is not None:
+			effective_run_style_key = (
+				effective_paragraph_style_key,
+				ooxml_run.style.id if ooxml_run.style is not None else None,
+				StyleProperties.ooxml_fingerprint(run_properties=ooxml_run.properties)
+				if ooxml_run.properties is not None else None
+			)
+			cached_effective_run_style: Optional[Style] = self._effective_run_styles_cache.get(effective_run_style_key)
+			if cached_effective_run_style is not None:
+				return Run.from_ooxml(ooxml_run=ooxml_run, style=cached_effective_run_style)
 		
 		if ooxml_run.style is not None:
 			effective_run_style: Style = Style(
@@ -72,18 +128,36 @@ class EffectiveDocumentFromOoxml(ArbitraryBaseModel):
 				id=run_id_str,
 				properties=StyleProperties.aggregate_ooxml(
 					agg=effective_run_style.properties,
-					add=StyleProperties.from_ooxml(run_properties=ooxml_run.properties),
+					add=StyleProperties.from_ooxml(run_properties=ooxml_run.properties, memo=self._style_properties_memo),
 					default=self.effective_styles_from_ooxml.get_default().properties
 				)
 			)
+		
+		if effective_run_style_key is not None:
+			self._effective_run_styles_cache[effective_run_style_key] = effective_run_style
 
 		return Run.from_ooxml(ooxml_run=ooxml_run, style=effective_run_style)
 
+	@staticmethod
+	def _effective_paragraph_style_key(ooxml_paragraph: OOXML_PARAGRAPH.Paragraph) -> tuple:
+		"""
+		Key which identifies the effective paragraph style (before any run style properties are pulled into it),
+		 given by the paragraph style id and the fingerprint of the paragraph direct formatting.
+		"""
+		return (
+			ooxml_paragraph.style.id if ooxml_paragraph.style is not None else None,
+			StyleProperties.ooxml_fingerprint(
+				run_properties=ooxml_paragraph.properties.run_properties,
+				paragraph_properties=ooxml_paragraph.properties
+			) if ooxml_paragraph.properties is not None else None
+		)
+
 	def _compute_effective_texts(
 			self,
 			ooxml_texts: list[OOXML_RUN.Run | OOXML_PARAGRAPH.Hyperlink],
 			effective_paragraph_style: Style,
-			block_id: int
+			block_id: int,
+			effective_paragraph_style_key: Optional[tuple] = None
 		) -> list[PARAGRAPH_CONTENT]:
 
 		effective_texts: list[PARAGRAPH_CONTENT] = []
@@ -95,7 +169,10 @@ class EffectiveDocumentFromOoxml(ArbitraryBaseModel):
 			if isinstance(ooxml_text, OOXML_RUN.Run):
 				run_id_str: str = f"__@PARAGRAPH={block_id}@RUN={text_id}__"
 				curr_text: Run = self.compute_effective_run(
-					ooxml_run=ooxml_text, effective_paragraph_style=effective_paragraph_style, run_id_str=run_id_str
+					ooxml_run=ooxml_text,
+					effective_paragraph_style=effective_paragraph_style,
+					run_id_str=run_id_str,
+					effective_paragraph_style_key=effective_paragraph_style_key
 				)
 					
 			elif isinstance(ooxml_text, OOXML_PARAGRAPH.Hyperlink):				
@@ -105,7 +182,8 @@ class EffectiveDocumentFromOoxml(ArbitraryBaseModel):
 						self.compute_effective_run(
 							ooxml_run=ooxml_run,
 							effective_paragraph_style=effective_paragraph_style,
-							run_id_str=f"__@PARAGRAPH={block_id}@HYPERLINK={text_id}@RUN={i}__"
+							run_id_str=f"__@PARAGRAPH={block_id}@HYPERLINK={text_id}@RUN={i}__",
+							effective_paragraph_style_key=effective_paragraph_style_key
 						)
 					)
 
@@ -137,7 +215,8 @@ class EffectiveDocumentFromOoxml(ArbitraryBaseModel):
 					add=(
 						StyleProperties.from_ooxml(
 							run_properties=ooxml_paragraph.properties.run_properties,
-							paragraph_properties=ooxml_paragraph.properties
+							paragraph_properties=ooxml_paragraph.properties,
+							memo=self._style_properties_memo
 						)
 					),
 					default=self.effective_styles_from_ooxml.get_default().properties
@@ -151,7 +230,10 @@ class EffectiveDocumentFromOoxml(ArbitraryBaseModel):
 				effective_paragraph_style: Style = self.effective_styles_from_ooxml.get_default()
 
 		effective_paragraph_content: list[PARAGRAPH_CONTENT] = self._compute_effective_texts(
-			ooxml_texts=ooxml_paragraph.content, effective_paragraph_style=effective_paragraph_style, block_id=block_id
+			ooxml_texts=ooxml_paragraph.content,
+			effective_paragraph_style=effective_paragraph_style,
+			block_id=block_id,
+			effective_paragraph_style_key=self._effective_paragraph_style_key(ooxml_paragraph=ooxml_paragraph)
 		)
 
 		# TODO: put this logic inside the style properties interface
@@ -186,7 +268,19 @@ class EffectiveDocumentFromOoxml(ArbitraryBaseModel):
 					)
 
 			if shared_text_run_style_properties != effective_paragraph_style.properties.run_style_properties:
-				effective_paragraph_style.properties.run_style_properties.patch(other=shared_text_run_style_properties)
+				derived_effective_paragraph_style: Style = effective_paragraph_style.derive(
+					properties=effective_paragraph_style.properties.derive(
+						run_style_properties=effective_paragraph_style.properties.run_style_properties.derive(
+							other=shared_text_run_style_properties
+						)
+					)
+				)
+				self._rebind_effective_texts_style(
+					effective_texts=effective_paragraph_content,
+					old_style=effective_paragraph_style,
+					new_style=derived_effective_paragraph_style
+				)
+				effective_paragraph_style = derived_effective_paragraph_style
 
 		# TODO: Check if there is whitespace in front of the paragraph contents
 		# Cases:
@@ -201,6 +295,19 @@ class EffectiveDocumentFromOoxml(ArbitraryBaseModel):
 			format=Format(style=effective_paragraph_style)
 		)
 
+	@staticmethod
+	def _rebind_effective_texts_style(effective_texts: list[PARAGRAPH_CONTENT], old_style: Style, new_style: Style) -> None:
+		"""
+		Texts which directly inherit the effective paragraph style (same instance) must follow it when it is derived.
+		"""
+		for effective_text in effective_texts:
+			if effective_text.style is old_style:
+				effective_text.style = new_style
+			if isinstance(effective_text, Hyperlink):
+				for effective_run in effective_text.content:
+					if effective_run.style is old_style:
+						effective_run.style = new_style
+
 	def _compute_effective_cells(
 			self, ooxml_cells: list[OOXML_TABLE.TableCell], effective_row_style: Style, block_id: int
 		) -> list[Cell]:
@@ -267,7 +374,10 @@ class EffectiveDocumentFromOoxml(ArbitraryBaseModel):
 		"""
 		Iterate through the blocks of the document, routing each block according to the type of block
 		"""
-		for block_id, ooxml_block in enumerate(self.ooxml_document.body):
+		for block_id, ooxml_block in enumerate(self._ooxml_body):
+			if ooxml_block.numbering is not None:
+				self._ooxml_block_numberings[block_id] = (ooxml_block.numbering, ooxml_block.indentation_level)
+
 			match type(ooxml_block):
 				case OOXML_PARAGRAPH.Paragraph:
 					self.effective_document[block_id] = self.compute_effective_paragraph(ooxml_paragraph=ooxml_block, block_id=block_id)
@@ -278,55 +388,40 @@ class EffectiveDocumentFromOoxml(ArbitraryBaseModel):
 					continue
 					raise ValueError(f"Unexpected ooxml block: {type(ooxml_block)}>")
 
+		self._ooxml_body = None
+
 	def _associate_effective_text_styles(self, effective_texts: list[Run]) -> None:
-		# TODO: Optimize this loop so the inner effective styles loop is only done once
 		for effective_text in effective_texts:
-			found_effective_style_match: bool = False
-			for effective_style in self.effective_styles_from_ooxml.effective_styles.values():
-				if effective_text.style == effective_style:
-					effective_text.style = effective_style
-					found_effective_style_match = True
-					break
-			
-			if not found_effective_style_match:
-				self.effective_styles_from_ooxml.effective_styles[effective_text.style.id] = effective_text.style
+			effective_text.style = self.effective_styles_from_ooxml.intern(style=effective_text.style)
 
 	def _associate_effective_block_styles(self) -> None:
 		"""_summary_
 		"""
 		for effective_block in self.effective_document.values():
-			found_effective_style_match: bool = False
-			for effective_style in self.effective_styles_from_ooxml.effective_styles.values():
-				if effective_block.format.style == effective_style:
-					effective_block.format.style = effective_style
-					found_effective_style_match = True
-					break
-			
-			if not found_effective_style_match:
-				self.effective_styles_from_ooxml.effective_styles[effective_block.format.style.id] = effective_block.format.style
+			effective_block.format.style = self.effective_styles_from_ooxml.intern(style=effective_block.format.style)
 			
 			if isinstance(effective_block, Paragraph):
 				self._associate_effective_text_styles(effective_texts=effective_block.content)
 
 	def _associate_effective_block_indexes(self) -> None:
 		for effective_block in self.effective_document.values():
-			# TODO: Add typehint for ooxml table
-			ooxml_block: OOXML_PARAGRAPH.Paragraph = self.ooxml_document.body[effective_block.id]
-
 			# TODO Look for any style - numbering association
-			if ooxml_block.numbering is not None:
+			ooxml_block_numbering: Optional[tuple[OoxmlNumbering, int]] = self._ooxml_block_numberings.get(effective_block.id)
+			if ooxml_block_numbering is not None:
 				# Index associated through the block (or block style)
+				ooxml_numbering, ooxml_level_id = ooxml_block_numbering
 				effective_block_index: Index = self.effective_numberings_from_ooxml.get_index(
-					ooxml_abstract_numbering_id=ooxml_block.numbering.abstract_numbering.id,
-					ooxml_numbering_id=ooxml_block.numbering.id,
-					ooxml_level_id=ooxml_block.indentation_level
+					ooxml_abstract_numbering_id=ooxml_numbering.abstract_numbering.id,
+					ooxml_numbering_id=ooxml_numbering.id,
+					ooxml_level_id=ooxml_level_id
 				)
 
 				effective_block.format.index = effective_block_index
 
 	def _resolve_index(self, effective_block: Block, prev_effective_block: Block) -> bool:
-		# ! TODO: Maybe its stupid to have to check the level key all the time like this
-		indentation_level: Optional[int] = next((ordered_level_id for ordered_level_id, level in effective_block.format.index.enumeration.levels.items() if level.id == effective_block.format.index.level.id), None)
+		indentation_level: Optional[int] = effective_block.format.index.enumeration.level_key(
+			level_id=effective_block.format.index.level.id
+		)
 		if indentation_level is None:
 			raise ValueError("") # TODO
 
@@ -378,10 +473,10 @@ class EffectiveDocumentFromOoxml(ArbitraryBaseModel):
 						)
 
 		# Associate the index counter
-		effective_block.format.index.index_ctr = {
-			k: v for k, v in self._computed_numberings_index_ctr[effective_block.format.index.numbering.id].items()
-			if v is not None and k <= indentation_level
-		}
+		effective_block.format.index.index_ctr = IndexCounters.from_level_counters(
+			level_counters=self._computed_numberings_index_ctr[effective_block.format.index.numbering.id],
+			level_key=indentation_level
+		)
 
 		return True
 
@@ -422,20 +517,18 @@ class EffectiveDocumentFromOoxml(ArbitraryBaseModel):
 		# Dummy partial index to detect the index string
 		# It should not matter what index combination is used to extract the detected index
 		dummy_enumeration: Enumeration = next(enumeration for enumeration in matched_enumerations)
-		dummy_level: Level = next(level for level in matched_levels if level.id in [l.id for l in dummy_enumeration.levels.values()])
-		
-		# ! TODO: Maybe its stupid to have to check the level key all the time like this
-		detected_level_key: int = next(level_key for level_key, level in dummy_enumeration.levels.items() if dummy_level.id == level.id)
+		detected_level_key: int = next(
+			dummy_enumeration.level_key(level_id=level.id) for level in matched_levels
+			if dummy_enumeration.level_key(level_id=level.id) is not None
+		)
 
 		seen_runs: list[Run] = []
 		for i, run in enumerate(effective_paragraph.content):
 			seen_runs.append(run)
 			partial_text: Run = Run(text="".join([t.text for t in seen_runs]), style=seen_runs[0].style)
-			detected_index_str_match = re.match(dummy_enumeration.detection_regexes[detected_level_key], partial_text.text)
+			detected_index_str_match = dummy_enumeration.detection_patterns[detected_level_key].match(partial_text.text)
 			if detected_index_str_match:
-				partial_text.text = re.sub(
-					dummy_enumeration.detection_regexes[detected_level_key], "", partial_text.text
-				)
+				partial_text.text = dummy_enumeration.detection_patterns[detected_level_key].sub("", partial_text.text)
 				effective_paragraph.content = [partial_text] + effective_paragraph.content[i+1:]
 
 				return detected_index_str_match.group(0) # TODO: why group(0)?
@@ -448,13 +541,13 @@ class EffectiveDocumentFromOoxml(ArbitraryBaseModel):
 			# It should not matter what index combination is used to extract the detected index
 			
 			dummy_enumeration: Enumeration = next(enumeration for enumeration in matched_enumerations)
-			dummy_level: Level = next(level for level in matched_levels if level.id in [l.id for l in dummy_enumeration.levels.values()])
-
-			# ! TODO: Maybe its stupid to have to check the level key all the time like this
-			detected_level_key: int = next(level_key for level_key, level in dummy_enumeration.levels.items() if dummy_level.id == level.id)
+			detected_level_key: int = next(
+				dummy_enumeration.level_key(level_id=level.id) for level in matched_levels
+				if dummy_enumeration.level_key(level_id=level.id) is not None
+			)
 
 			# Extract the level key contents inside the detected index string			
-			detected_level_key_index_str_match = re.match(dummy_enumeration.detection_regexes[detected_level_key], implied_index_str)
+			detected_level_key_index_str_match = dummy_enumeration.detection_patterns[detected_level_key].match(implied_index_str)
 
 			if detected_level_key_index_str_match is not None:
 				# print(dummy_enumeration.id, dummy_level.id)
@@ -483,12 +576,9 @@ class EffectiveDocumentFromOoxml(ArbitraryBaseModel):
 			text="".join([t.text for t in effective_paragraph.content]), style=effective_paragraph.content[0].style
 		)
 
-		matches: dict[str, dict[str, list[Level]]] = {}
-		for effective_enumeration in self.effective_numberings_from_ooxml.effective_enumerations.values():
-			
-			effective_enumeration_matches: dict[str, list[Level]] = effective_enumeration.detect(run=full_text)
-			if self._n_implied_index_matches(matches={effective_enumeration.id: effective_enumeration_matches}) != 0:
-				matches[effective_enumeration.id] = effective_enumeration_matches
+		matches: dict[str, dict[str, list[Level]]] = self.effective_numberings_from_ooxml.enumerations_detector.detect(
+			run=full_text
+		)
 		
 		n__matches: int = self._n_implied_index_matches(matches=matches)
 		n_full_matches: int = self._n_implied_index_matches(matches=matches, only_full=True)
@@ -575,137 +665,128 @@ class EffectiveDocumentFromOoxml(ArbitraryBaseModel):
 				implied_index_matches: Optional[dict[str, ImpliedIndex]] = self._implied_index_detection(effective_paragraph=effective_block)
 				if implied_index_matches is not None:			
 					self._effective_paragraphs_implied_index_matches_map[effective_block.id] = implied_index_matches
+
+		implied_index_detection_stats: dict[str, int] = self.implied_index_detection_stats
+		logger.debug(
+			"Implied index detection prefilter rejected "
+			f"{implied_index_detection_stats['prefilter_rejections']}/{implied_index_detection_stats['checks']} paragraphs."
+		)
+
+	@property
+	def implied_index_detection_stats(self) -> dict[str, int]:
+		"""
+		Number of paragraphs checked for implied indexes, and how many of them were rejected by the detection prefilter.
+		"""
+		enumerations_detector: EnumerationsDetector = self.effective_numberings_from_ooxml.enumerations_detector
+		return {"checks": enumerations_detector.n_checks, "prefilter_rejections": enumerations_detector.n_prefilter_rejections}
 	
+	@staticmethod
+	def _implied_index_counters_distance(
+		implied_index_levels_prev_ctr: tuple[int, ...], other_implied_index_levels_prev_ctr: tuple[int, ...]
+	) -> int:
+		"""
+		Number of levels whose previous index counter differs between both states.
+		Upper bound of the continuity that one state can still gain over the other, since each level choice equalizes its counter.
+		"""
+		return sum(
+			prev_ctr != other_prev_ctr
+			for prev_ctr, other_prev_ctr in zip(implied_index_levels_prev_ctr, other_implied_index_levels_prev_ctr)
+		)
+
 	def _resolve_implied_indexes(self) -> None:
 		"""
-		Decide on the implied indexes trying to maximize index counter continuity.
+		Decide on the implied indexes maximizing index counter continuity.
 		All of this is under the assumption of index counter continuity.
 		(Honestly, if that is not the case the problem is not my code but your document structure :P)
-		But, if anyone has a better a idea, please tell me I will gladly listen...
-		"""
-
-		implied_index_levels_prev_boundary: dict[str, int] = {} # Can be updated as decisions take place
-		# ! TODO: What about actual index boundary to update prev and next continuities!? (for next boundary it isnt mandatory but it would be nice)
-		for i, effective_paragraph_id in enumerate(self._effective_paragraphs_implied_index_matches_map.keys()):
-			implied_index_matches: dict[str, ImpliedIndex] = self._effective_paragraphs_implied_index_matches_map[effective_paragraph_id]
-			
-			# Compute implied index levels next boundaries
-			# TODO: I'm sure this can be optimized so it doesnt need to do the full loop each time, but for now to simplify things (and it isnt even needed outside the case of implied_index_matches > 1)
-			implied_index_levels_next_boundary: dict[str, Optional[int]] = {}
-			for j in range(i+1, len(self._effective_paragraphs_implied_index_matches_map)):
-				future_implied_index_matches: dict[str, ImpliedIndex] = list(self._effective_paragraphs_implied_index_matches_map.values())[j]  # TODO: maybe take this out of the two loops so it doesnt need to be converted to list every time?
-
-				for future_implied_index_level_id, future_implied_index_match in future_implied_index_matches.items():
-					if (
-						future_implied_index_level_id in implied_index_matches.keys() # Do not consider it if not needed
-						and future_implied_index_level_id not in implied_index_levels_next_boundary.keys() # Only consider it if it is the first appearance
-					):
-						implied_index_levels_next_boundary[future_implied_index_level_id] = future_implied_index_match.index_ctr
-
-				if len(implied_index_levels_next_boundary) == len(implied_index_matches): break # All needed implied index level next boundaries have been found
-
-			# print("@@@@@@@@@@@@@@@@@@@@@@@@@")
-
-			# print(f"{effective_paragraph_id=} => {list(implied_index_matches.values())[0].index_str} [{len(implied_index_matches)}]")
-			# for iim in implied_index_matches.values():
-			# 	print("\t - ", iim.level.id, iim.level.properties.marker_type, "=>", iim.index_str, iim.index_ctr)
 
-			# print("-------------------------")
-			effective_paragraph: Paragraph = self.effective_document[effective_paragraph_id]
+		Maximizes, over every choice of one implied index match per paragraph (in document order),
+		 the number of index counters continuing the previous index counter of their level along the chosen sequence.
+		The continuity of a choice depends on the previous index counters of every level,
+		 so the dynamic programming states are those counters (not the implied index matches):
+		 sequences reaching the same counters are merged keeping the best score, which is exact.
+		A state is also dropped when the best one outscores it by more than the number of levels whose counters differ,
+		 since that is the most it can still gain over the best one (exact as well).
+		Only if more than _max_implied_index_states states remain, the lowest scoring ones are dropped (beam search),
+		 which is the only approximation.
+		Each paragraph is resolved in O(s x k x L) for s states (at most _max_implied_index_states), k implied index matches
+		 and L levels, so the resolution is linear in the number of paragraphs (see utils.benchmark).
+		Only the current states keep their counters, previous paragraphs keep backpointers (O(n x s) memory).
+		Ties are broken in favour of the first implied index match (detection order).
+		"""
+		implied_index_matches_per_paragraph: list[list[ImpliedIndex]] = [
+			list(implied_index_matches.values())
+			for implied_index_matches in self._effective_paragraphs_implied_index_matches_map.values()
+		]
+		if len(implied_index_matches_per_paragraph) == 0:
+			return
+
+		# Previous index counters are kept as tuples indexed by level position (levels without one are at 0)
+		level_positions: dict[str, int] = {}
+		for implied_index_matches in implied_index_matches_per_paragraph:
+			for implied_index_match in implied_index_matches:
+				level_positions.setdefault(implied_index_match.level.id, len(level_positions))
+
+		# Current states: (score, previous index counters by level position)
+		states: list[tuple[int, tuple[int, ...]]] = [(0, (0,) * len(level_positions))]
+		# Backpointers of the states of each paragraph: (implied index match position, previous state position)
+		backpointers: list[list[tuple[int, int]]] = []
+		for implied_index_matches in implied_index_matches_per_paragraph:
+			curr_states: list[tuple[int, tuple[int, ...]]] = []
+			curr_backpointers: list[tuple[int, int]] = []
+			curr_states_positions: dict[tuple[int, ...], int] = {}
+			for j, implied_index_match in enumerate(implied_index_matches):
+				level_position: int = level_positions[implied_index_match.level.id]
+				index_ctr: int = implied_index_match.index_ctr
+				for i, (prev_score, implied_index_levels_prev_ctr) in enumerate(states):
+					# Continuity of the implied index match with the previous index counter of its level
+					score: int = prev_score + (implied_index_levels_prev_ctr[level_position] + 1 == index_ctr)
+					implied_index_levels_ctr: tuple[int, ...] = (
+						implied_index_levels_prev_ctr[:level_position] + (index_ctr,)
+						+ implied_index_levels_prev_ctr[level_position + 1:]
+					)
 
-			if len(implied_index_matches) == 1:
-				# If only one implied index match, associate it to the effective paragraph
-				# print("## Only one implied index match")
-				effective_paragraph.format.implied_index = next(iter(implied_index_matches.values()))
-			else:
-				# TODO: document this well it is a complex algorithm
-				# print("## More than one implied index match")
-				# print("Prev boundary", implied_index_levels_prev_boundary)
-				# print("Next boundary", implied_index_levels_next_boundary)
-
-				implied_index_matches_continuity_diff: dict[str, dict[str, int]] = {
-					implied_index_level_id: {
-						"prev": implied_index_levels_prev_boundary.get(implied_index_level_id, 0) + 1 - implied_index_match.index_ctr,
-						"next": implied_index_match.index_ctr - (implied_index_levels_next_boundary.get(implied_index_level_id, len(self.effective_document)) - 1)
-					}
-					for implied_index_level_id, implied_index_match in implied_index_matches.items()
-				}
-				# for implied_index_level, implied_index_match_continuity in implied_index_matches_continuity_diff.items():
-				# 	print(implied_index_level, "prev continuity", implied_index_match_continuity["prev"], "next continuity", implied_index_match_continuity["next"])
-				
-				implied_index_matches_with_full_continuity: dict[str, dict[str, int]] = {
-					implied_index_level: implied_index_match_continuity
-					for implied_index_level, implied_index_match_continuity in implied_index_matches_continuity_diff.items()
-					if implied_index_match_continuity["prev"] == 0 and implied_index_match_continuity["next"] == 0
-				}
-				implied_index_matches_with_partial_prev_continuity: dict[str, dict[str, int]] = {
-					implied_index_level: implied_index_match_continuity
-					for implied_index_level, implied_index_match_continuity in implied_index_matches_continuity_diff.items()
-					if implied_index_match_continuity["prev"] == 0 and implied_index_match_continuity["next"] != 0
-				}
-				implied_index_matches_with_partial_next_continuity: dict[str, dict[str, int]] = {
-					implied_index_level: implied_index_match_continuity
-					for implied_index_level, implied_index_match_continuity in implied_index_matches_continuity_diff.items()
-					if implied_index_match_continuity["prev"] != 0 and implied_index_match_continuity["next"] == 0
-				}
-				implied_index_matches_with_no_continuity: dict[str, dict[str, int]] = {
-					implied_index_level: implied_index_match_continuity
-					for implied_index_level, implied_index_match_continuity in implied_index_matches_continuity_diff.items()
-					if implied_index_match_continuity["prev"] != 0 and implied_index_match_continuity["next"] != 0
-				}
-				# print(
-				# 	"full:", len(implied_index_matches_with_full_continuity),
-				# 	"partial_prev:", len(implied_index_matches_with_partial_prev_continuity),
-				# 	"partial_next:", len(implied_index_matches_with_partial_next_continuity),
-				# 	"none:", len(implied_index_matches_with_no_continuity),
-				# )
-				
-				match len(implied_index_matches_with_full_continuity):
-					case 0: # No implied index matches with full continuity
-						# print("### No implied index match with full continuity")
-						match (len(implied_index_matches_with_partial_prev_continuity), len(implied_index_matches_with_partial_next_continuity)):
-							case (0, 0): # No implied index matches with partial continuity
-								# print("#### No implied index match with partial continuity")
-								effective_paragraph.format.implied_index = next(iter(implied_index_matches.values())) # TODO for now to test it
-
-							case (1, 0): # If only one implied index match with partial previous continuity, associate it to the effective paragraph
-								# print("#### Only one implied index match with partial previous continuity")
-								effective_paragraph.format.implied_index = implied_index_matches[next(iter(implied_index_matches_with_partial_prev_continuity.keys()))]
-
-							case (0, 1): # If only one implied index match with partial next continuity, associate it to the effective paragraph
-								# print("#### Only one implied index match with partial next continuity")
-								effective_paragraph.format.implied_index = implied_index_matches[next(iter(implied_index_matches_with_partial_next_continuity.keys()))]
-
-							case _:
-								# print("#### More than one implied index match with partial continuity")
-								effective_paragraph.format.implied_index = next(iter(implied_index_matches.values())) # TODO for now to test it
-
-					case 1: # If only one implied index match with full continuity, associate it to the effective paragraph
-						# print("### Only one implied index match with full continuity")
-						effective_paragraph.format.implied_index = implied_index_matches[next(iter(implied_index_matches_with_full_continuity.keys()))]
-
-					case _: # More than one implied index match with full continuity
-						# print("### More than one implied index match with full continuity")
-						effective_paragraph.format.implied_index = implied_index_matches[next(iter(implied_index_matches_with_full_continuity.keys()))] # TODO for now to test it
-			
-			# Update implied index levels previous boundaries based on the decision
-			implied_index_levels_prev_boundary[effective_paragraph.format.implied_index.level.id] = effective_paragraph.format.implied_index.index_ctr			
-			# print("!!!!!!!! =>", effective_paragraph.format.implied_index.level.id)
-			# print("-------------------------")
-			# print()
+					position: Optional[int] = curr_states_positions.get(implied_index_levels_ctr)
+					if position is None:
+						curr_states_positions[implied_index_levels_ctr] = len(curr_states)
+						curr_states.append((score, implied_index_levels_ctr))
+						curr_backpointers.append((j, i))
+					elif score > curr_states[position][0]:
+						curr_states[position] = (score, implied_index_levels_ctr)
+						curr_backpointers[position] = (j, i)
+
+			# Drop the states that can no longer catch up with the best one
+			best_score, best_implied_index_levels_ctr = max(curr_states, key=lambda state: state[0])
+			kept_positions: list[int] = [
+				position for position, (score, implied_index_levels_ctr) in enumerate(curr_states)
+				if best_score - score <= self._implied_index_counters_distance(
+					implied_index_levels_prev_ctr=implied_index_levels_ctr,
+					other_implied_index_levels_prev_ctr=best_implied_index_levels_ctr
+				)
+			]
+			if len(kept_positions) > self._max_implied_index_states:
+				kept_positions = sorted(heapq.nlargest(
+					self._max_implied_index_states, kept_positions, key=lambda position: (curr_states[position][0], -position)
+				))
+
+			states = [curr_states[position] for position in kept_positions]
+			backpointers.append([curr_backpointers[position] for position in kept_positions])
+
+		# Backtrack the best sequence of implied index matches
+		best_state: int = max(range(len(states)), key=lambda i: (states[i][0], -i))
+		for effective_paragraph_id, implied_index_matches, paragraph_backpointers in zip(
+			reversed(self._effective_paragraphs_implied_index_matches_map.keys()),
+			reversed(implied_index_matches_per_paragraph),
+			reversed(backpointers)
+		):
+			implied_index_match_position, best_state = paragraph_backpointers[best_state]
+			self.effective_document[effective_paragraph_id].format.implied_index = implied_index_matches[implied_index_match_position]
 
 	def _associate_implied_index_levels(self) -> None:
 		for effective_block in self.effective_document.values():
 			if isinstance(effective_block, Paragraph) and effective_block.format.implied_index is not None:	
-				found_effective_level_match: bool = False
-				for effective_level in self.effective_numberings_from_ooxml.effective_levels.values():
-					if effective_block.format.implied_index.level == effective_level:
-						effective_block.format.implied_index.level = effective_level
-						found_effective_level_match = True
-						break
-				
-				if not found_effective_level_match:
-					self.effective_numberings_from_ooxml.effective_levels[effective_block.format.implied_index.level.id] = effective_block.format.implied_index.level		
+				effective_block.format.implied_index.level = self.effective_numberings_from_ooxml.intern_level(
+					level=effective_block.format.implied_index.level
+				)
 
 	def load(self) -> None:
 		self._compute_effective_blocks()
@@ -1,11 +1,12 @@
 from __future__ import annotations
 from typing import Optional
+from functools import cached_property
 from ooxml_docx.structure.numberings import OoxmlNumberings
 import ooxml_docx.structure.numberings as OOXML_NUMBERINGS
 
 from utils.pydantic import ArbitraryBaseModel
 
-from abstract_docx.data_models.numberings import Numbering, Enumeration, LevelProperties, Level, Index
+from abstract_docx.data_models.numberings import Numbering, Enumeration, LevelProperties, Level, Index, EnumerationsDetector
 from abstract_docx.data_models.styles import Style, StyleProperties
 
 from abstract_docx.normalization.styles import EffectiveStylesFromOoxml
@@ -25,7 +26,7 @@ class EffectiveNumberingsFromOoxml(ArbitraryBaseModel):
 	- Abstract numbering => Numbering (However intermediate steps to compute enumerations use abstract enumerations, which are the enumeration representation of the abstract numbering)
 	- Numbering => Enumeration
 	"""
-	ooxml_numberings: OoxmlNumberings
+	ooxml_numberings: Optional[OoxmlNumberings]  # Only needed during normalization, None once detached (see detach)
 
 	effective_numberings: dict[int, Numbering]
 	effective_enumerations: dict[str, Enumeration]
@@ -38,6 +39,8 @@ class EffectiveNumberingsFromOoxml(ArbitraryBaseModel):
 
 	# Auxiliary data for intermediate steps
 	_discovered_effective_abstract_enumerations: dict[str, Enumeration] = {}
+	# Hash-consing table of the effective levels, keyed by their deduplication key (see intern_level)
+	_interned_levels: dict[tuple, Level] = {}
 	# It might be the case that the effective enumeration style has no actual level properties
 	_discovered_effective_enumeration_styles: dict[str, Optional[Enumeration]] = {}
 
@@ -314,6 +317,7 @@ class EffectiveNumberingsFromOoxml(ArbitraryBaseModel):
 	
 			# Reconstruct levels inside the effective enumeration with the new id
 			effective_enumeration.levels = _ordered_levels
+			effective_enumeration.reindex_levels()
 			self.effective_levels.update(_levels)
 
 			self.effective_numberings[ooxml_numbering.abstract_numbering.id].enumerations[effective_enumeration.id] = effective_enumeration
@@ -321,17 +325,8 @@ class EffectiveNumberingsFromOoxml(ArbitraryBaseModel):
 	def _associate_effective_level_styles(self) -> None:
 		"""_summary_
 		"""
-		# TODO: Optimize this loop so the inner effective styles loop is only done once
 		for effective_level in self.effective_levels.values():
-			found_effective_style_match: bool = False
-			for effective_style in self.effective_styles_from_ooxml.effective_styles.values():
-				if effective_level.style == effective_style:
-					effective_level.style = effective_style
-					found_effective_style_match = True
-					break
-			
-			if not found_effective_style_match:
-				self.effective_styles_from_ooxml.effective_styles[effective_level.style.id] = effective_level.style
+			effective_level.style = self.effective_styles_from_ooxml.intern(style=effective_level.style)
 
 	def load(self) -> None:
 		"""
@@ -340,33 +335,45 @@ class EffectiveNumberingsFromOoxml(ArbitraryBaseModel):
 		self._associate_effective_level_styles()
 
 	def _deduplicate_levels(self) -> None:
+		"""
+		Groups the effective levels with equal properties and style in a single pass, hashing their deduplication key.
+		Each group keeps the id of its first level,
+		 the ids of every level in the group are aliased to it in map_ooxml_to_effective_deduplicated_levels.
+		"""
 		groups: dict[str, Level] = {}
-		_map_ooxml_to_effective_deduplicated_levels: dict[str, list[str]] = {}
+		group_ids: dict[tuple, str] = {}
 		for level in self.effective_levels.values():
-			duplicated_in_group: Optional[str] = None
-			for group_id, grouped_level in groups.items():
-				if level == grouped_level:	
-					duplicated_in_group = group_id
-			
-			if duplicated_in_group is not None:
-				new_group_id = f"{duplicated_in_group}&{level.id}" # TODO: what happens if for some reason there already exists a level with this id?
-				
-				groups[new_group_id] = groups.pop(duplicated_in_group)
-				groups[new_group_id].id = new_group_id
+			deduplication_key: tuple = level.deduplication_key
 
-				_map_ooxml_to_effective_deduplicated_levels[new_group_id] = (
-					_map_ooxml_to_effective_deduplicated_levels.pop(duplicated_in_group)
-				)
-				_map_ooxml_to_effective_deduplicated_levels[new_group_id].append(level.id)
-			else:
-				groups[level.id] = level.model_copy()  # It should be treated as another instance of the level in memory
-				_map_ooxml_to_effective_deduplicated_levels[level.id] = [level.id]
+			group_id: Optional[str] = group_ids.get(deduplication_key)
+			if group_id is None:
+				group_id = level.id
+				group_ids[deduplication_key] = group_id
+				groups[group_id] = level.model_copy()  # It should be treated as another instance of the level in memory
+			
+			self.map_ooxml_to_effective_deduplicated_levels[level.id] = group_id
 		
 		self.effective_levels = groups
+		self._interned_levels = {level.deduplication_key: level for level in self.effective_levels.values()}
+
+	def intern_level(self, level: Level) -> Level:
+		"""
+		Hash-consing of effective levels, returns the canonical effective level equal to the given one.
+		If there is no such effective level yet, the given level is registered as a new effective level.
+		Must be used after deduplication, so that the canonical effective levels are unique.
+
+		:param level: Effective level.
+		:return: Canonical effective level instance.
+		"""
+		deduplication_key: tuple = level.deduplication_key
+
+		interned_level: Optional[Level] = self._interned_levels.get(deduplication_key)
+		if interned_level is None:
+			self.effective_levels[level.id] = level
+			self._interned_levels[deduplication_key] = level
+			interned_level = level
 		
-		for group_id, level_ids in _map_ooxml_to_effective_deduplicated_levels.items():
-			for level_id in level_ids:
-				self.map_ooxml_to_effective_deduplicated_levels[level_id] = group_id
+		return interned_level
 	
 	def _associate_deduplicated_levels(self) -> None:
 		for enumeration in self.effective_enumerations.values():
@@ -376,6 +383,7 @@ class EffectiveNumberingsFromOoxml(ArbitraryBaseModel):
 				_levels[ordered_level_id] = self.effective_levels[new_level_id]
 				
 			enumeration.levels = _levels
+			enumeration.reindex_levels()
 
 	def _deduplicate_enumerations(self) -> None:
 		groups: dict[str, Enumeration] = {}
@@ -426,6 +434,43 @@ class EffectiveNumberingsFromOoxml(ArbitraryBaseModel):
 		# self._deduplicate_enumerations()
 		# self._associate_deduplicated_enumerations()
 	
+	def fork(self, effective_styles_from_ooxml: EffectiveStylesFromOoxml) -> EffectiveNumberingsFromOoxml:
+		"""
+		Copy of the normalized effective numberings to be extended by another document (see intern_level).
+		Numberings, enumerations and levels are not modified after normalization, so they are shared,
+		 only the tables that the document normalization extends are copied.
+		Must be forked before the enumerations detector is used, since it keeps per document counters.
+		:param effective_styles_from_ooxml: Forked effective styles of the document.
+		:return: Forked effective numberings.
+		"""
+		forked_effective_numberings_from_ooxml: EffectiveNumberingsFromOoxml = self.model_copy(
+			update={
+				"effective_levels": dict(self.effective_levels),
+				"effective_styles_from_ooxml": effective_styles_from_ooxml
+			}
+		)
+		forked_effective_numberings_from_ooxml._interned_levels = dict(self._interned_levels)
+
+		return forked_effective_numberings_from_ooxml
+
+	def detach(self, effective_styles_from_ooxml: EffectiveStylesFromOoxml) -> EffectiveNumberingsFromOoxml:
+		"""
+		Copy of the normalized effective numberings without the OOXML numberings (and their lxml trees),
+		 see EffectiveStylesFromOoxml.detach.
+		:param effective_styles_from_ooxml: Detached effective styles.
+		:return: Detached effective numberings.
+		"""
+		return self.model_copy(
+			update={"ooxml_numberings": None, "effective_styles_from_ooxml": effective_styles_from_ooxml}
+		)
+
+	@cached_property
+	def enumerations_detector(self) -> EnumerationsDetector:
+		"""
+		Implied index detector of the effective enumerations, must be used after deduplication.
+		"""
+		return EnumerationsDetector.build(enumerations=self.effective_enumerations.values())
+
 	def get_mapped_enumeration_id(self, ooxml_numbering_id: int) -> str:
 		return self.map_ooxml_to_effective_deduplicated_enumerations.get(str(ooxml_numbering_id))
 
@@ -18,7 +18,7 @@ class EffectiveStylesFromOoxml(ArbitraryBaseModel):
 
 	In the context of the project, effective means the result from the normalization of the source structure.
 	"""
-	ooxml_styles: OoxmlStyles
+	ooxml_styles: Optional[OoxmlStyles]  # Only needed during normalization, None once detached (see detach)
 	effective_styles: dict[str, Style]
 	map_ooxml_to_effective_merged_styles: dict[str, str] = {}
 	map_effective_to_effective_deduplicated_styles: dict[str, str] = {}
@@ -26,6 +26,8 @@ class EffectiveStylesFromOoxml(ArbitraryBaseModel):
 	# Auxiliary data for intermediate steps
 	_effective_paragraph_styles: dict[str, Style] = {}
 	_effective_run_styles: dict[str, Style] = {}
+	# Hash-consing table of the effective styles, keyed by their deduplication key (see intern)
+	_interned_styles: dict[tuple, Style] = {}
 
 	@staticmethod
 	def load_effective_default_style(doc_defaults: OOXML_STYLES.DocDefaults) -> Style:
@@ -154,41 +156,80 @@ class EffectiveStylesFromOoxml(ArbitraryBaseModel):
 		self._compile_remaining_effective_run_styles()
 
 	def deduplicate(self) -> None:
+		"""
+		Groups the effective styles with equal properties in a single pass, hashing their deduplication key.
+		Each group keeps the id of its first style,
+		 the ids of every style in the group are aliased to it in map_effective_to_effective_deduplicated_styles.
+		"""
 		groups: dict[str, Style] = {}
-		_map_effective_to_effective_deduplicated_styles: dict[str, list[str]] = {}
+		group_ids: dict[tuple, str] = {}
 		for style in self.effective_styles.values():
-			duplicated_in_group: Optional[str] = None
-			for group_id, grouped_style in groups.items():
-				if style == grouped_style:	
-					duplicated_in_group = group_id
+			deduplication_key: tuple = style.properties.deduplication_key
 			
-			if duplicated_in_group is not None:
-				new_group_id = f"{duplicated_in_group}&{style.id}" # TODO: what happens if for some reason there already exists a style with this id?
-				
-				groups[new_group_id] = groups.pop(duplicated_in_group)
-				groups[new_group_id].id = new_group_id
-
-				_map_effective_to_effective_deduplicated_styles[new_group_id] = (
-					_map_effective_to_effective_deduplicated_styles.pop(duplicated_in_group)
-				)
-				_map_effective_to_effective_deduplicated_styles[new_group_id].append(style.id)
-			else:
-				groups[style.id] = style.model_copy()  # It should be treated as another instance of the style in memory
-				_map_effective_to_effective_deduplicated_styles[style.id] = [style.id]
+			group_id: Optional[str] = group_ids.get(deduplication_key)
+			if group_id is None:
+				group_id = style.id
+				group_ids[deduplication_key] = group_id
+				groups[group_id] = style.model_copy()  # It should be treated as another instance of the style in memory
+			
+			self.map_effective_to_effective_deduplicated_styles[style.id] = group_id
 
 		self.effective_styles = groups
+		self._interned_styles = {
+			style.properties.deduplication_key: style for style in self.effective_styles.values()
+		}
+	
+	def intern(self, style: Style) -> Style:
+		"""
+		Hash-consing of effective styles, returns the canonical effective style equal to the given one.
+		If there is no such effective style yet, the given style is registered as a new effective style.
+		Must be used after deduplication, so that the canonical effective styles are unique.
+
+		:param style: Effective style.
+		:return: Canonical effective style instance.
+		"""
+		deduplication_key: tuple = style.properties.deduplication_key
 		
-		for group_id, style_ids in _map_effective_to_effective_deduplicated_styles.items():
-			for style_id in style_ids:
-				self.map_effective_to_effective_deduplicated_styles[style_id] = group_id
+		interned_style: Optional[Style] = self._interned_styles.get(deduplication_key)
+		if interned_style is None:
+			self.effective_styles[style.id] = style
+			self._interned_styles[deduplication_key] = style
+			interned_style = style
+		
+		return interned_style
 	
+	def fork(self) -> EffectiveStylesFromOoxml:
+		"""
+		Copy of the normalized effective styles to be extended by another document (see intern).
+		Effective styles are immutable, so they are shared, only the tables that the document normalization extends are copied.
+		:return: Forked effective styles.
+		"""
+		forked_effective_styles_from_ooxml: EffectiveStylesFromOoxml = self.model_copy(
+			update={"effective_styles": dict(self.effective_styles)}
+		)
+		forked_effective_styles_from_ooxml._interned_styles = dict(self._interned_styles)
+
+		return forked_effective_styles_from_ooxml
+
+	def detach(self) -> EffectiveStylesFromOoxml:
+		"""
+		Copy of the normalized effective styles without the OOXML styles (and their lxml trees) they were normalized from,
+		 so they can be kept around (e.g. TemplateCache) without keeping the source document alive.
+		:return: Detached effective styles.
+		"""
+		return self.model_copy(update={"ooxml_styles": None})
+
 	def get_mapped_id(self, ooxml_style_id: str) -> str:
 		effective_merged_style_id: str = self.map_ooxml_to_effective_merged_styles.get(ooxml_style_id, ooxml_style_id)
 		return self.map_effective_to_effective_deduplicated_styles.get(effective_merged_style_id, effective_merged_style_id)
 
 	def get(self, ooxml_style_id: str) -> Optional[Style]:
-		r: Optional[Style] = self.effective_styles.get(self.get_mapped_id(ooxml_style_id=ooxml_style_id))
-		return r.model_copy(deep=True) if r is not None else None
+		"""
+		Effective styles are immutable, so they are shared instead of copied (use Style.derive to modify them).
+		:param ooxml_style_id: Id of the OOXML style.
+		:return: Effective style associated to the OOXML style, None if not found.
+		"""
+		return self.effective_styles.get(self.get_mapped_id(ooxml_style_id=ooxml_style_id))
 
 	def get_default(self) -> Style:
 		return self.get(ooxml_style_id="__DocDefaults__")
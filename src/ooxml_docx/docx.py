@@ -1,5 +1,5 @@
 from __future__ import annotations
-from typing import Optional
+from typing import Optional, Iterator
 import os
 from io import BytesIO
 import zipfile
@@ -11,6 +11,8 @@ from ooxml_docx.relationships import OoxmlRelationships
 from ooxml_docx.structure.styles import OoxmlStyles
 from ooxml_docx.structure.numberings import OoxmlNumberings
 from ooxml_docx.structure.document import OoxmlDocument
+from ooxml_docx.document.paragraph import Paragraph
+from ooxml_docx.document.table import Table
 
 import logging
 logger = logging.getLogger(__name__)
@@ -19,30 +21,48 @@ logger = logging.getLogger(__name__)
 class OoxmlDocxStructure(ArbitraryBaseModel):
 	styles: OoxmlStyles  # Parses ooxml information about styles
 	numberings: OoxmlNumberings  # Parses ooxml information about numberings
-	document: OoxmlDocument  # Parses ooxml information about the document content
+	relationships: OoxmlRelationships  # Parses ooxml information about the document part relationships
+	# Parses ooxml information about the document content (empty when the document is meant to be streamed)
+	document: Optional[OoxmlDocument] = None
 
 	@classmethod
-	def load(cls, docx: OoxmlDocx) -> OoxmlDocxStructure:
-
-		logger.debug("Building OOXML styles part...")
-		styles = OoxmlStyles.build(ooxml_styles_part=docx.ooxml.content["word"].content["styles.xml"])
-		logger.debug("OOXML styles part built.")
+	def load(
+		cls,
+		docx: OoxmlDocx,
+		load_document: bool = True,
+		styles: Optional[OoxmlStyles] = None,
+		numberings: Optional[OoxmlNumberings] = None
+	) -> OoxmlDocxStructure:
+		"""
+		:param docx: OOXML docx whose parts are built.
+		:param load_document: Whether to build the document content, defaults to True.
+		:param styles: Already built styles of a byte identical styles part (e.g. same template), defaults to None.
+		:param numberings: Already built numberings of a byte identical numbering part (built with the given styles),
+		 defaults to None.
+		"""
+		if styles is None or numberings is None:
+			logger.debug("Building OOXML styles part...")
+			styles = OoxmlStyles.build(ooxml_styles_part=docx.ooxml.content["word"].content["styles.xml"])
+			logger.debug("OOXML styles part built.")
 
-		logger.debug("Building OOXML numberings part...")
-		numberings = OoxmlNumberings.build(
-			ooxml_numbering_part=docx.ooxml.content["word"].content["numbering.xml"], styles=styles
-		)
-		logger.debug("OOXML numberings part built.")
+			logger.debug("Building OOXML numberings part...")
+			numberings = OoxmlNumberings.build(
+				ooxml_numbering_part=docx.ooxml.content["word"].content["numbering.xml"], styles=styles
+			)
+			logger.debug("OOXML numberings part built.")
 		
-		logger.debug("Building OOXML document part...")
 		document_relationships = OoxmlRelationships.parse(ooxml_rels=docx.ooxml.content["word"].relationships.content["document.xml.rels"].ooxml)
-		document = OoxmlDocument.build(
-			ooxml_document_part=docx.ooxml.content["word"].content["document.xml"], 
-			styles=styles, numberings=numberings, relationships=document_relationships
-		)
-		logger.debug("OOXML document part built.")
 		
-		return cls(styles=styles, numberings=numberings, document=document)
+		document: Optional[OoxmlDocument] = None
+		if load_document:
+			logger.debug("Building OOXML document part...")
+			document = OoxmlDocument.build(
+				ooxml_document_part=docx.ooxml.content["word"].content["document.xml"], 
+				styles=styles, numberings=numberings, relationships=document_relationships
+			)
+			logger.debug("OOXML document part built.")
+		
+		return cls(styles=styles, numberings=numberings, relationships=document_relationships, document=document)
 
 
 class OoxmlDocx(ArbitraryBaseModel):
@@ -55,36 +75,86 @@ class OoxmlDocx(ArbitraryBaseModel):
 	structure: Optional[OoxmlDocxStructure] = None
 
 	@classmethod
-	def read(cls, file_path: str) -> OoxmlDocx:
+	def read(cls, file_path: str, load_document: bool = True) -> OoxmlDocx:
 		"""
 		An .docx file can be essentially understood as a compressed folder with an specific file tree structure.
 		In order to actually read the contents of the document, first convert the file into a .zip folder.
 		This is actually done inside a memory buffer, so no need to actually save the actual compressed folder.
 		Then the contents of the document are saved into memory by crawling the file tree structure.
+		The contents are kept as raw bytes, each OOXML part is only parsed when it is actually needed.
+
+		:param file_path: Path of the .docx file.
+		:param load_document: Whether to build the document content, set to False in order to use .stream_body() instead.
 		"""
-		contents: dict[str, str] = {}
 		with open(file_path, "rb") as f:
-			# Read the .docx file as a .zip and crawl through the contents
-			with zipfile.ZipFile(BytesIO(f.read())) as zip_ref:
-				for f_name in zip_ref.namelist():
-					# ! TODO: Handle other file extensions inside the package
-					if f_name.endswith(".xml") or f_name.endswith(".rels"):
-						contents[f_name] = zip_ref.read(f_name)
+			content: bytes = f.read()
+
+		return cls.load(content=content, file_path=file_path, load_document=load_document)
+
+	@classmethod
+	def load(cls, content: bytes, file_path: str = "document.docx", load_document: bool = True) -> OoxmlDocx:
+		"""
+		Same as .read(), but from the raw bytes of the .docx file (already read, e.g. asynchronously or from a request).
+		:param content: Raw bytes of the .docx file.
+		:param file_path: Path (or name) identifying the document, defaults to "document.docx".
+		:param load_document: Whether to build the document content, set to False in order to use .stream_body() instead.
+		"""
+		ooxml_docx: OoxmlDocx = cls.unpack(content=content, file_path=file_path)
+		ooxml_docx.build(load_document=load_document)
+
+		return ooxml_docx
+
+	@classmethod
+	def unpack(cls, content: bytes, file_path: str = "document.docx") -> OoxmlDocx:
+		"""
+		Unpacks the OOXML package of the .docx file without building its structure (see .build()).
+		None of the parts is parsed yet, so their raw content can still be inspected (e.g. OoxmlPart.content_hash).
+		:param content: Raw bytes of the .docx file.
+		:param file_path: Path (or name) identifying the document, defaults to "document.docx".
+		"""
+		contents: dict[str, bytes] = {}
+		# Read the .docx file as a .zip and crawl through the contents
+		with zipfile.ZipFile(BytesIO(content)) as zip_ref:
+			for f_name in zip_ref.namelist():
+				# ! TODO: Handle other file extensions inside the package
+				if f_name.endswith(".xml") or f_name.endswith(".rels"):
+					contents[f_name] = zip_ref.read(f_name)
 		logger.debug(f"{file_path} contents read.")
 
+		return cls(file_path=file_path, ooxml=OoxmlPackage.load(name=os.path.splitext(file_path)[0], content=contents))
+	
+	def build(
+		self,
+		load_document: bool = True,
+		styles: Optional[OoxmlStyles] = None,
+		numberings: Optional[OoxmlNumberings] = None
+	) -> None:
+		"""
+		Builds the structure of the document (see OoxmlDocxStructure.load).
+		"""
 		logger.debug(f"Building .docx OOXML package structure...")
-		ooxml_docx: OoxmlDocx = cls(
-			file_path=file_path, ooxml=OoxmlPackage.load(name=os.path.splitext(file_path)[0], content=contents)
+		self.structure = OoxmlDocxStructure.load(
+			docx=self, load_document=load_document, styles=styles, numberings=numberings
 		)
-		ooxml_docx.build()
 		logger.info(f".docx OOXML package structure built.")
 
-		return ooxml_docx
-	
-	def build(self) -> None:
-		"""_summary_
+	def stream_body(self) -> Iterator[Paragraph | Table]:
 		"""
-		self.structure = OoxmlDocxStructure.load(docx=self)
+		Yields the document body blocks one at a time, without keeping the whole document in memory.
+		Intended to be used when the .docx was read with load_document=False (see OoxmlDocument.stream()).
+		A yielded block is only valid until the iterator advances: its OOXML elements are then cleared,
+		 so blocks must be fully processed one at a time (e.g. list(stream_body()) leaves emptied blocks).
+		:return: Iterator of parsed paragraphs and tables.
+		"""
+		if self.structure is None:
+			raise ValueError("The .docx OOXML package structure must be built before streaming the document body.")
+
+		return OoxmlDocument.stream(
+			ooxml_document_part=self.ooxml.content["word"].content["document.xml"],
+			styles=self.structure.styles,
+			numberings=self.structure.numberings,
+			relationships=self.structure.relationships
+		)
 
 	def __str__(self):
 		s = f"\U0001F4D1 \033[36m\033[1m'{self.file_path}'\033[0m\n"
@@ -6,19 +6,75 @@ from lxml.etree import _Element as etreeElement
 from utils.printing import etree_to_str
 
 import re
+import hashlib
+from functools import lru_cache
 
 from utils.pydantic import ArbitraryBaseModel
+from pydantic import PrivateAttr
 
 from rich.tree import Tree
 from utils.printing import rich_tree_to_str
 
 
-class OoxmlElement(ArbitraryBaseModel):
+# When enabled, xpath query results are wrapped as validated OoxmlElement pydantic models
+#  and OOXML properties elements check their tag on construction.
+_strict_mode: bool = False
+
+
+def set_strict_mode(strict: bool) -> None:
 	"""
-	Represents an OOXML (Office Open XML) element.
-	Wrapper class for lxml _Element (referenced throughout as etreeElement).
+	Opt-in strict mode for the OOXML layer (see _strict_mode).
+	Useful for debugging malformed documents, at the cost of slower parsing.
+	:param strict: Boolean indicating whether strict mode should be enabled.
 	"""
-	element: etreeElement
+	global _strict_mode
+	_strict_mode = strict
+
+
+def is_strict_mode() -> bool:
+	return _strict_mode
+
+
+@lru_cache(maxsize=4096)
+def _compile_xpath_query(query: str, namespaces: tuple[tuple[str, str], ...]) -> etree.XPath:
+	"""
+	Process-wide cache of compiled xpath queries, keyed by the query string and the (hashable) namespace map.
+	Avoids lxml recompiling the same expressions for every single element being queried.
+	:param query: Xpath query string.
+	:param namespaces: Namespace map items (without empty namespace prefix).
+	:return: Compiled xpath query.
+	"""
+	return etree.XPath(query, namespaces=dict(namespaces))
+
+
+@lru_cache(maxsize=256)
+def _prepare_namespaces_from_nsmap(nsmap: tuple[tuple[Optional[str], str], ...]) -> tuple[tuple[str, str], ...]:
+	"""
+	Cached version of the namespace map preparation (see OoxmlElement._prepare_namespaces).
+	Every element of the same OOXML part shares the namespace declarations of the part root,
+	 so in practice there is a single entry for each kind of document root.
+	:param nsmap: Namespace map items of the element.
+	:return: Namespace map items without empty namespace key.
+	:raises KeyError: If 'ens' is already being used as a prefix for another namespace.
+	"""
+	namespaces: dict[Optional[str], str] = dict(nsmap)
+	if None in namespaces.keys():
+		if "ens" not in namespaces.keys():
+			namespaces["ens"] = namespaces.pop(None)
+		else:
+			raise KeyError(
+				"Empty namespace prefix could not be assigned generic 'ens' prefix because it is already in use"
+			)
+	
+	return tuple(namespaces.items())
+
+
+class _OoxmlElementQueries:
+	"""
+	Shared behaviour between the validated OoxmlElement model and the lightweight OoxmlNode wrapper.
+	Expects the subclass to provide the wrapped lxml element as the 'element' attribute.
+	"""
+	__slots__ = ()
 
 	@property
 	def local_name(self) -> str:
@@ -40,7 +96,18 @@ class OoxmlElement(ArbitraryBaseModel):
 		:return: Xpath query results, None when the result is empty.
 		:raises ValueError: Raises error if nullable or single constraints are failed.
 		"""
-		query_result: list[etreeElement] = self.element.xpath(query, namespaces=self._prepare_namespaces())
+		namespaces: tuple[tuple[str, str], ...] = self._query_namespaces()
+		try:
+			query_result: list[etreeElement] = _compile_xpath_query(query=query, namespaces=namespaces)(self.element)
+		except etree.XPathEvalError:
+			# The namespace might be declared below the part root (e.g. inside drawings), retry with the element own map
+			element_namespaces: tuple[tuple[str, str], ...] = _prepare_namespaces_from_nsmap(
+				nsmap=tuple(self.element.nsmap.items())
+			)
+			if element_namespaces == namespaces:
+				raise
+			self._namespaces = element_namespaces
+			query_result: list[etreeElement] = _compile_xpath_query(query=query, namespaces=element_namespaces)(self.element)
 		
 		if len(query_result) == 0:
 			if not nullable:
@@ -70,29 +137,36 @@ class OoxmlElement(ArbitraryBaseModel):
 		:return: Namespace dictionary without empty namespace key.
 		:raises KeyError: If 'ens' is already being used as a prefix for another namespace.
 		"""
-		if None in self.element.nsmap.keys():
-			if "ens" not in self.element.nsmap.keys():
-				namespaces = self.element.nsmap.copy()  # Use a copy of the nsmap because lxml nsmap is immutable
-				namespaces["ens"] = namespaces.pop(None)
-				return namespaces
-			else:
-				raise KeyError(
-					"Empty namespace prefix could not be assigned generic 'ens' prefix because it is already in use"
-				)
-		
-		return self.element.nsmap
+		return dict(self._query_namespaces())
+
+	def _query_namespaces(self) -> tuple[tuple[str, str], ...]:
+		"""
+		Prepared namespaces used for the xpath queries of the element (see _prepare_namespaces).
+		lxml rebuilds the nsmap by walking up the ancestors on every access, so it is only computed once per part root
+		 and passed down to the wrappers of the query results.
+		:return: Namespace map items without empty namespace key.
+		"""
+		if self._namespaces is None:
+			self._namespaces = _prepare_namespaces_from_nsmap(nsmap=tuple(self.element.nsmap.items()))
+
+		return self._namespaces
 
 	# ! TODO: Refine attributes type casting wrapper
 	def _cast_xpath_query_result(self, query_result_element: Any) -> XpathQueryResult:
 		"""
 		Cast xpath query result to the appropriate OoxmlElement class if eligible.
 		Necessary because when xpath is used to search attributes it does not return the XML element but the content itself.
+		Elements are wrapped as lightweight OoxmlNode objects, unless strict mode is enabled (validated OoxmlElement).
 
 		:param query_result_element: Raw xpath query result.
 		:return: Casted xpath query result.
 		"""
 		if isinstance(query_result_element, etreeElement):
-			return OoxmlElement(element=query_result_element)
+			if _strict_mode:
+				ooxml_element: OoxmlElement = OoxmlElement(element=query_result_element)
+				ooxml_element._namespaces = self._namespaces
+				return ooxml_element
+			return OoxmlNode(element=query_result_element, namespaces=self._namespaces)
 		
 		return query_result_element
 
@@ -106,25 +180,99 @@ class OoxmlElement(ArbitraryBaseModel):
 		return etree_to_str(element=self.element)
 
 
+
+class OoxmlElement(_OoxmlElementQueries, ArbitraryBaseModel):
+	"""
+	Represents an OOXML (Office Open XML) element.
+	Wrapper class for lxml _Element (referenced throughout as etreeElement).
+	"""
+	element: etreeElement
+
+	# Prepared namespaces inherited from the part root (see _query_namespaces)
+	_namespaces: Optional[tuple[tuple[str, str], ...]] = PrivateAttr(default=None)
+
+
+class OoxmlNode(_OoxmlElementQueries):
+	"""
+	Lightweight (slotted and validation free) wrapper for lxml _Element, used for intermediate xpath query results.
+	Most query results are only used to be queried again or to be passed down into the parsing of an OoxmlElement,
+	 so paying for a pydantic model instance (and its validation) for each one of them is unnecessary.
+	Exposes the same querying interface as OoxmlElement.
+	"""
+	__slots__ = ("element", "_namespaces")
+
+	def __init__(self, element: etreeElement, namespaces: Optional[tuple[tuple[str, str], ...]] = None) -> None:
+		self.element = element
+		self._namespaces = namespaces  # Prepared namespaces inherited from the part root (see _query_namespaces)
+
+	def __repr__(self) -> str:
+		return f"{self.__class__.__name__}(element={self.element!r})"
+
+
 # Auxiliary type for the result of the .xpath_query method
-XpathQueryResult = Optional[OoxmlElement | list[OoxmlElement] | Any]
+XpathQueryResult = Optional[OoxmlElement | OoxmlNode | list[OoxmlElement | OoxmlNode] | Any]
 
 
 class OoxmlPart(ArbitraryBaseModel):
 	"""
 	Represents an OOXML (Office Open XML) part, which is a component of an OOXML package.
+	The part content is stored as raw bytes and only parsed into an lxml tree the first time it is accessed,
+	 since most of the parts inside a package (themes, settings, headers, footers...) are never used.
 	"""
 	name: str
-	ooxml: OoxmlElement
+	content: Optional[bytes] = None
+
+	_ooxml: Optional[OoxmlElement] = PrivateAttr(default=None)
+	_content_hash: Optional[str] = PrivateAttr(default=None)
 
 	@classmethod
-	def load(cls, name: str, content: str) -> OoxmlPart:
+	def load(cls, name: str, content: bytes) -> OoxmlPart:
 		"""
-		Initializes an OOXML part with the content of a OOXML file (.xml).
+		Initializes an OOXML part with the content of a OOXML file (.xml), without parsing it.
 		:param name: The name of the OOXML part. Removing file extension if necessary.
-		:param content: String representation of the OOXML.
+		:param content: Raw bytes representation of the OOXML.
+		"""
+		return cls(name=name, content=content)
+
+	@property
+	def is_parsed(self) -> bool:
+		return self._ooxml is not None
+
+	@property
+	def ooxml(self) -> OoxmlElement:
 		"""
-		return cls(name=name, ooxml=OoxmlElement(element=etree.fromstring(content)))
+		Parses the raw content of the part on first access.
+		Once parsed, the raw content is released because the lxml tree already holds all the information.
+		:return: Parsed OOXML part root element.
+		"""
+		if self._ooxml is None:
+			self._ooxml = OoxmlElement(element=etree.fromstring(self.content))
+			self.content = None
+		
+		return self._ooxml
+
+	@property
+	def is_raw_content_hashable(self) -> bool:
+		"""
+		Whether content_hash is (or can still be) the digest of the raw content, i.e. it was requested before parsing.
+		"""
+		return self._content_hash is not None or self.content is not None
+
+	@property
+	def content_hash(self) -> str:
+		"""
+		SHA-256 digest of the raw content of the part, only computed on demand (e.g. TemplateCache.key).
+		Should be requested before the part is parsed, since parsing releases the raw content.
+		Otherwise the digest is computed from the serialized lxml tree, which is stable but differs from the raw one
+		 (see is_raw_content_hashable).
+		:return: Hex digest of the content.
+		"""
+		if self._content_hash is None:
+			self._content_hash = hashlib.sha256(
+				self.content if self.content is not None else etree.tostring(self._ooxml.element)
+			).hexdigest()
+		
+		return self._content_hash
 
 	def __str__(self) -> str:
 		s = f"\U0001F4C4 \033[36m\033[1m'{self.name}'\033[0m\n"
@@ -142,19 +290,19 @@ class OoxmlPackage(ArbitraryBaseModel):
 	relationships: Optional[OoxmlPackage] = None
 
 	@classmethod
-	def load(cls, name: str, content: dict[str, str]) -> OoxmlPackage:
+	def load(cls, name: str, content: dict[str, bytes]) -> OoxmlPackage:
 		"""
 		Initializes an OOXML package with the given name and OOXML contents.
 		:param name: The name of the OOXML package.
 		:param content: Dictionary representation of the OOXML content inside the OOXML package.
 		 - Keys: OOXML file part root path name (split by '/').
-		 - Values: String representation of the OOXML part.
+		 - Values: Raw bytes representation of the OOXML part (parsed lazily by each part).
 		"""
 		_content = {}
 		relationships = None
 
 		# Load package level parts and initialize subpackage structures
-		packages: dict[str, dict[str, str]] = {}
+		packages: dict[str, dict[str, bytes]] = {}
 		for item_name, item_content in content.items():
 			_name = item_name.split("/")
 			
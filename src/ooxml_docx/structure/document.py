@@ -1,5 +1,9 @@
 from __future__ import annotations
-from typing import Optional
+from typing import Optional, Iterator
+from io import BytesIO
+
+from lxml import etree
+from lxml.etree import _Element as etreeElement
 
 from rich.tree import Tree
 from utils.printing import rich_tree_to_str
@@ -70,23 +74,100 @@ class OoxmlDocument(OoxmlElement):
 
 		content: list[Paragraph | Table] = []
 		for ooxml_element in ooxml_content:
-			match ooxml_element.local_name:
-				case "p":
-					element: Paragraph = Paragraph.parse(
-						ooxml_paragraph=ooxml_element, styles=styles, numberings=numberings, relationships=relationships
-					)
-				case "tbl":
-					element: Table = Table.parse(
-						ooxml_table=ooxml_element, styles=styles, numberings=numberings, relationships=relationships
-					)
-				case _:
-					# ! TODO: Remove continue
-					continue
-					raise ValueError(f"Unexpected OOXML element: <w:{ooxml_element.local_name}>")
-			content.append(element)
+			element: Optional[Paragraph | Table] = OoxmlDocument._parse_body_element(
+				ooxml_element=ooxml_element, styles=styles, numberings=numberings, relationships=relationships
+			)
+			if element is not None:
+				content.append(element)
 			
 		return content
 
+	@staticmethod
+	def _parse_body_element(
+			ooxml_element: OoxmlElement,
+			styles: OoxmlStyles,
+			numberings: OoxmlNumberings,
+			relationships: OoxmlRelationships
+		) -> Optional[Paragraph | Table]:
+		"""
+		Parses a single child element of the document body.
+		:param ooxml_element: Raw OOXML body child element.
+		:return: Parsed paragraph or table, None if the element is not a supported block.
+		"""
+		match ooxml_element.local_name:
+			case "p":
+				return Paragraph.parse(
+					ooxml_paragraph=ooxml_element, styles=styles, numberings=numberings, relationships=relationships
+				)
+			case "tbl":
+				return Table.parse(
+					ooxml_table=ooxml_element, styles=styles, numberings=numberings, relationships=relationships
+				)
+			case _:
+				# ! TODO: Remove return None
+				return None
+				raise ValueError(f"Unexpected OOXML element: <w:{ooxml_element.local_name}>")
+
+	@classmethod
+	def stream(
+			cls,
+			ooxml_document_part: OoxmlPart,
+			styles: OoxmlStyles,
+			numberings: OoxmlNumberings,
+			relationships: OoxmlRelationships
+		) -> Iterator[Paragraph | Table]:
+		"""
+		Streaming alternative to .build(), yields the parsed body blocks one at a time (in document order).
+		Uses lxml iterparse over the raw document part, so the whole document DOM is never held in memory:
+		 once the consumer requests the next block, the OOXML elements of the previous block are cleared.
+		Therefore, a yielded block (and its OOXML properties) must be fully processed before advancing the iterator,
+		 keeping it afterwards (e.g. list(stream(...))) leaves it with emptied OOXML elements.
+
+		If the document part has already been parsed, it falls back to iterating over the parsed body.
+
+		:param ooxml_document_part: OOXML document part (document.xml).
+		:return: Iterator of parsed paragraphs and tables.
+		"""
+		if ooxml_document_part.is_parsed:
+			yield from cls._parse_body(
+				ooxml_document_part=ooxml_document_part, styles=styles, numberings=numberings, relationships=relationships
+			)
+			return
+
+		found_body: bool = False
+		n_blocks: int = 0
+		# Only paragraphs and tables can be body blocks, filtering the tags avoids handling every single end event
+		for _, element in etree.iterparse(
+			BytesIO(ooxml_document_part.content), events=("end",), tag=("{*}body", "{*}p", "{*}tbl")
+		):
+			if etree.QName(element).localname == "body":
+				found_body = True
+				continue
+
+			parent: Optional[etreeElement] = element.getparent()
+			if parent is None or etree.QName(parent).localname != "body":
+				# Nested paragraphs and tables (e.g. inside table cells) are parsed along with their parent block
+				continue
+
+			block: Optional[Paragraph | Table] = cls._parse_body_element(
+				ooxml_element=OoxmlElement(element=element), styles=styles, numberings=numberings, relationships=relationships
+			)
+			if block is not None:
+				n_blocks += 1
+				yield block
+
+			# Release the processed body block, as well as any preceding siblings (bookmarks, etc.)
+			element.clear(keep_tail=True)
+			while element.getprevious() is not None:
+				del parent[0]
+		
+		if not found_body:
+			# The body OOXML element should still be found inside the document no matter the actual content written
+			raise ValueError("No <w:body> OOXML element found inside the document.")
+		
+		if n_blocks == 0:
+			logger.warning("No textual content detected inside the document.")
+
 	def __str__(self) -> str:
 		return rich_tree_to_str(self._tree_str_())
 
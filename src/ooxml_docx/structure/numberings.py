@@ -2,11 +2,12 @@ from __future__ import annotations
 from typing import Optional
 
 from utils.pydantic import ArbitraryBaseModel
+from pydantic import PrivateAttr
 
 from rich.tree import Tree
 from utils.printing import rich_tree_to_str
 
-from ooxml_docx.ooxml import OoxmlElement, OoxmlPart
+from ooxml_docx.ooxml import OoxmlElement, OoxmlNode, OoxmlPart
 from ooxml_docx.structure.properties import RunProperties, ParagraphProperties
 from ooxml_docx.structure.styles import OoxmlStyleTypes, OoxmlStyles, ParagraphStyle, _NumberingStyle
 
@@ -48,7 +49,7 @@ class Level(OoxmlElement):
 	# however, it should not be empty and always associated to an abstract numbering definition.
 	abstract_numbering: Optional[AbstractNumbering] = None
 
-	properties: Optional[list[OoxmlElement]] = None  # TODO, this is actually never used because it does not have the commodity of xpath_query
+	properties: Optional[list[OoxmlElement | OoxmlNode]] = None  # TODO, this is actually never used because it does not have the commodity of xpath_query
 	run_properties: Optional[RunProperties] = None
 	paragraph_properties: Optional[ParagraphProperties] = None
 	
@@ -340,7 +341,7 @@ class Numbering(OoxmlElement):
 
 	@classmethod
 	def parse(
-		cls, ooxml_numbering: OoxmlElement, abstract_numberings: list[AbstractNumbering], styles: OoxmlStyles
+		cls, ooxml_numbering: OoxmlElement, abstract_numberings: dict[int, AbstractNumbering], styles: OoxmlStyles
 	) -> Numbering:
 		"""_summary_
 
@@ -367,28 +368,22 @@ class Numbering(OoxmlElement):
 	
 	@staticmethod
 	def _parse_abstract_numbering(
-		ooxml_numbering: OoxmlElement, abstract_numberings: list[AbstractNumbering]
+		ooxml_numbering: OoxmlElement, abstract_numberings: dict[int, AbstractNumbering]
 	) -> AbstractNumbering:
 		"""_summary_
 
 		:param ooxml_numbering: _description_
-		:param abstract_numberings: _description_
+		:param abstract_numberings: Abstract numberings indexed by their id.
 		:raises ValueError: _description_
 		:return: _description_
 		"""
 		abstract_numbering_id: int = int(ooxml_numbering.xpath_query(
 			query="./w:abstractNumId/@w:val", nullable=False, singleton=True
 		))
-		abstract_numbering: Optional[AbstractNumbering] = next(
-			(
-				abstract_numbering for abstract_numbering in abstract_numberings
-				if abstract_numbering.id == abstract_numbering_id
-			),
-			None
-		)
+		abstract_numbering: Optional[AbstractNumbering] = abstract_numberings.get(abstract_numbering_id)
 		if abstract_numbering is None:
 			raise ValueError(
-				f"No abstract numbering definition <w:abstractNum> found for abstractNumId: {abstract_numbering}."
+				f"No abstract numbering definition <w:abstractNum> found for abstractNumId: {abstract_numbering_id}."
 			)
 
 		return abstract_numbering
@@ -486,6 +481,20 @@ class Numbering(OoxmlElement):
 		return 0
 
 
+def _index_by_id(elements: list[AbstractNumbering] | list[Numbering]) -> dict[int, AbstractNumbering | Numbering]:
+	"""
+	Indexes the given (abstract) numberings by their id.
+	In the case of duplicated ids, the first occurrence is kept.
+	:param elements: List of abstract numberings or numberings.
+	:return: Dictionary of the elements keyed by their id.
+	"""
+	index: dict[int, AbstractNumbering | Numbering] = {}
+	for element in elements:
+		index.setdefault(element.id, element)
+	
+	return index
+
+
 def _reload_incomplete_numbering_styles_into_complete(numbering_styles: list[_NumberingStyle]) -> None:
 	for numbering_style in numbering_styles:
 		# Monkey patching
@@ -502,6 +511,10 @@ class OoxmlNumberings(ArbitraryBaseModel):
 	abstract_numberings: list[AbstractNumbering] = []
 	numberings: list[Numbering] = []
 
+	# Hashmap indexes of the abstract numberings and numberings, keyed by their respective ids
+	_abstract_numberings_index: dict[int, AbstractNumbering] = PrivateAttr(default_factory=dict)
+	_numberings_index: dict[int, Numbering] = PrivateAttr(default_factory=dict)
+
 	def _associate_styles_and_numberings(
 			self, styles: list[ParagraphStyle | NumberingStyle], style_type: OoxmlStyleTypes
 		) -> None:
@@ -567,13 +580,15 @@ class OoxmlNumberings(ArbitraryBaseModel):
 		abstract_numberings: list[AbstractNumbering] = cls._parse_abstract_numberings(
 			ooxml_numbering_part=ooxml_numbering_part, styles=styles
 		)
-		
-		ooxml_numberings: OoxmlNumberings = cls(
-			abstract_numberings=abstract_numberings,
-			numberings=cls._parse_numberings(
-				ooxml_numbering_part=ooxml_numbering_part, abstract_numberings=abstract_numberings, styles=styles
-			)
+		abstract_numberings_index: dict[int, AbstractNumbering] = _index_by_id(elements=abstract_numberings)
+
+		numberings: list[Numbering] = cls._parse_numberings(
+			ooxml_numbering_part=ooxml_numbering_part, abstract_numberings=abstract_numberings_index, styles=styles
 		)
+		
+		ooxml_numberings: OoxmlNumberings = cls(abstract_numberings=abstract_numberings, numberings=numberings)
+		ooxml_numberings._abstract_numberings_index = abstract_numberings_index
+		ooxml_numberings._numberings_index = _index_by_id(elements=numberings)
 
 		#
 		ooxml_numberings._associate_styles_and_numberings(styles=styles.roots.paragraph, style_type=OoxmlStyleTypes.PARAGRAPH)
@@ -603,11 +618,12 @@ class OoxmlNumberings(ArbitraryBaseModel):
 		
 	@staticmethod
 	def _parse_numberings(
-		ooxml_numbering_part: OoxmlPart, abstract_numberings: list[AbstractNumbering], styles: OoxmlStyles
+		ooxml_numbering_part: OoxmlPart, abstract_numberings: dict[int, AbstractNumbering], styles: OoxmlStyles
 	) -> list[Numbering]:
 		"""_summary_
 
 		:param ooxml_numbering_part: _description_
+		:param abstract_numberings: Abstract numberings indexed by their id.
 		:return: _description_
 		"""
 		ooxml_numberings: Optional[list[OoxmlElement]] = ooxml_numbering_part.ooxml.xpath_query(query="./w:num")
@@ -633,12 +649,15 @@ class OoxmlNumberings(ArbitraryBaseModel):
 		:param id: Id of the numbering being searched.
 		:return: Result of the search, a single Numbering object or None when no match is found.
 		"""
-		for numbering in self.numberings:
-			if numbering.id == id:
-				return numbering
-		
-		# No match found
-		return None
+		return self._numberings_index.get(id)
+
+	def find_abstract_numbering(self, id: int) -> Optional[AbstractNumbering]:
+		"""
+		Helper function for searching an abstract numbering based on its id.
+		:param id: Id of the abstract numbering being searched.
+		:return: Result of the search, a single AbstractNumbering object or None when no match is found.
+		"""
+		return self._abstract_numberings_index.get(id)
 
 	def __str__(self) -> str:
 		return rich_tree_to_str(self._tree_str_())
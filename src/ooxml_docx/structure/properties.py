@@ -1,7 +1,7 @@
 from __future__ import annotations
 from typing import Optional
 
-from ooxml_docx.ooxml import OoxmlElement
+from ooxml_docx.ooxml import OoxmlElement, OoxmlNode, is_strict_mode
 from pydantic import PrivateAttr
 
 class OoxmlProperties(OoxmlElement):
@@ -9,6 +9,7 @@ class OoxmlProperties(OoxmlElement):
 	Representation of an OOXML properties element.
 	Where, despite a general OOXML properties element not existing in the OOXML standard,
 	 it is helpful to have a general class that will enforce tag validation.
+	Tag validation is only enforced in strict mode, since the parsers already query the element by its tag.
 	
 	Instead of needing to specify the fields for each type of properties element, store as the whole OOXML element.
 	Avoids OOXML versioning problems, as properties child elements are the most changed between different OOXML versions.
@@ -19,7 +20,8 @@ class OoxmlProperties(OoxmlElement):
 
 	def __init__(self, **data):
 		super().__init__(**data)
-		self.validate()
+		if is_strict_mode():
+			self.validate()
 
 	def validate(self) -> None:
 		"""
@@ -35,17 +37,17 @@ class OoxmlProperties(OoxmlElement):
 
 
 class RunProperties(OoxmlProperties):
-	def __init__(self, ooxml: OoxmlElement):
+	def __init__(self, ooxml: OoxmlElement | OoxmlNode):
 		super().__init__(element=ooxml.element, tag="rPr")
 
 
 class ParagraphProperties(OoxmlProperties):
 	_run_properties: Optional[RunProperties] = PrivateAttr(default=None)
 
-	def __init__(self, ooxml: OoxmlElement):
+	def __init__(self, ooxml: OoxmlElement | OoxmlNode):
 		super().__init__(element=ooxml.element, tag="pPr")
 	
-		ooxml_run_properties: Optional[OoxmlElement] = ooxml.xpath_query(query="./rPr", singleton=True)
+		ooxml_run_properties: Optional[OoxmlElement | OoxmlNode] = ooxml.xpath_query(query="./rPr", singleton=True)
 		self._run_properties = RunProperties(ooxml=ooxml_run_properties) if ooxml_run_properties is not None else None
 	
 	@property
@@ -53,25 +55,25 @@ class ParagraphProperties(OoxmlProperties):
 		return self._run_properties
 
 class TableProperties(OoxmlProperties):
-	def __init__(self, ooxml: OoxmlElement):
+	def __init__(self, ooxml: OoxmlElement | OoxmlNode):
 		super().__init__(element=ooxml.element, tag="tblPr")
 
 
 class TableConditionalProperties(OoxmlProperties):
-	def __init__(self, ooxml: OoxmlElement):
+	def __init__(self, ooxml: OoxmlElement | OoxmlNode):
 		super().__init__(element=ooxml.element, tag="tblStylePr")
 
 
 class TableRowProperties(OoxmlProperties):
-	def __init__(self, ooxml: OoxmlElement):
+	def __init__(self, ooxml: OoxmlElement | OoxmlNode):
 		super().__init__(element=ooxml.element, tag="trPr")
 
 
 class TableCellProperties(OoxmlProperties):
-	def __init__(self, ooxml: OoxmlElement):
+	def __init__(self, ooxml: OoxmlElement | OoxmlNode):
 		super().__init__(element=ooxml.element, tag="tcPr")
 
 
 class NumberingProperties(OoxmlProperties):
-	def __init__(self, ooxml: OoxmlElement):
+	def __init__(self, ooxml: OoxmlElement | OoxmlNode):
 		super().__init__(element=ooxml.element, tag="numPr")
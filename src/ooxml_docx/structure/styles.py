@@ -1,7 +1,7 @@
 from __future__ import annotations
 from typing import Optional, Any
 from enum import Enum
-from pydantic import model_validator
+from pydantic import model_validator, PrivateAttr
 
 import re
 
@@ -10,7 +10,7 @@ from utils.pydantic import ArbitraryBaseModel
 from rich.tree import Tree
 from utils.printing import rich_tree_to_str
 
-from ooxml_docx.ooxml import OoxmlElement, OoxmlPart
+from ooxml_docx.ooxml import OoxmlElement, OoxmlNode, OoxmlPart
 from ooxml_docx.structure.properties import (
 	RunProperties, ParagraphProperties, 
 	TableProperties, TableConditionalProperties, TableRowProperties, TableCellProperties,
@@ -235,6 +235,9 @@ class OoxmlStylesRoots(ArbitraryBaseModel):
 	table: list[TableStyle] = []
 	numbering: list[_NumberingStyle] = []
 
+	# Hashmap index of every style in the style trees, keyed by style type and style id
+	_index: dict[tuple[OoxmlStyleTypes, str], Style] = PrivateAttr(default_factory=dict)
+
 	@classmethod
 	def build(cls, ooxml_styles_part: OoxmlElement) -> OoxmlStylesRoots:
 		"""_summary_
@@ -242,12 +245,44 @@ class OoxmlStylesRoots(ArbitraryBaseModel):
 		:param ooxml_styles_part: _description_
 		:return: _description_
 		"""
-		return cls(
+		roots: OoxmlStylesRoots = cls(
 			run=cls._parse_style_tree(ooxml_styles_part=ooxml_styles_part, style_type=OoxmlStyleTypes.RUN),
 			paragraph=cls._parse_style_tree(ooxml_styles_part=ooxml_styles_part, style_type=OoxmlStyleTypes.PARAGRAPH),
 			table=cls._parse_style_tree(ooxml_styles_part=ooxml_styles_part, style_type=OoxmlStyleTypes.TABLE),
 			numbering=cls._parse_style_tree(ooxml_styles_part=ooxml_styles_part, style_type=OoxmlStyleTypes.NUMBERING)
 		)
+		roots._build_index()
+
+		return roots
+
+	def _build_index(self) -> None:
+		"""
+		Builds the (style type, style id) index of the style trees.
+		Styles are indexed following the depth first traversal of the trees,
+		 so that in the case of duplicated ids the first match is kept (same as a tree search would).
+		"""
+		self._index = {}
+		for style_type, roots in (
+			(OoxmlStyleTypes.RUN, self.run),
+			(OoxmlStyleTypes.PARAGRAPH, self.paragraph),
+			(OoxmlStyleTypes.TABLE, self.table),
+			(OoxmlStyleTypes.NUMBERING, self.numbering)
+		):
+			folded_styles: list[Style] = []
+			for root in roots:
+				folded_styles = root.fold(agg=folded_styles)
+			
+			for style in folded_styles:
+				self._index.setdefault((style_type, style.id), style)
+
+	def get(self, id: str, type: OoxmlStyleTypes) -> Optional[Style]:
+		"""
+		Constant time lookup of a style by its id and type.
+		:param id: Id of the style being searched.
+		:param type: Style type of the style being searched.
+		:return: Matching style object or None when no match is found.
+		"""
+		return self._index.get((type, id))
 
 	@staticmethod
 	def _parse_style_tree(ooxml_styles_part: OoxmlPart, style_type: OoxmlStyleTypes) -> list[Style]:
@@ -354,7 +389,7 @@ class OoxmlStyles(ArbitraryBaseModel):
 		(Numbering style types are treated in the OoxmlDocxNumbering section).
 	"""
 	doc_defaults: Optional[DocDefaults] = None
-	latent_styles: Optional[OoxmlElement] = None
+	latent_styles: Optional[OoxmlElement | OoxmlNode] = None
 
 	roots: OoxmlStylesRoots
 
@@ -407,49 +442,18 @@ class OoxmlStyles(ArbitraryBaseModel):
 		:param type: Style type of the style being searched.
 		:return: Result of the search, a single style object or None when no match is found.
 		"""
+		if type is not None:
+			return self.roots.get(id=id, type=type)
 		
-		search_space: list[Style] = []
-		match type:
-			case OoxmlStyleTypes.RUN:
-				search_space = self.roots.run
-			case OoxmlStyleTypes.PARAGRAPH:
-				search_space = self.roots.paragraph
-			case OoxmlStyleTypes.TABLE:
-				search_space = self.roots.table
-			case OoxmlStyleTypes.NUMBERING:
-				search_space = self.roots.numbering
-			case _:
-				# Append all the style tree roots types into a single one
-				search_space = self.roots.run + self.roots.paragraph + self.roots.table + self.roots.numbering
-		
-		for root in search_space:
-			search_result: Optional[Style] = self._find(id=id, root=root)
+		for style_type in (
+			OoxmlStyleTypes.RUN, OoxmlStyleTypes.PARAGRAPH, OoxmlStyleTypes.TABLE, OoxmlStyleTypes.NUMBERING
+		):
+			search_result: Optional[Style] = self.roots.get(id=id, type=style_type)
 			if search_result is not None:
 				return search_result  # Return the first match
 		
 		# No match found
 		return None
-
-	def _find(self, id: str, root: Style) -> Optional[Style]:
-		"""
-		Searches the given id inside the given tree and returns the matching style found.
-		If no matches where found, returns None.
-
-		:param id: Id of the style being searched.
-		:param root: Style specific tree root being search on.
-		:return: Result of the search, a single style object or None when no match is found.
-		"""
-		if root.id == id:
-			return root
-		if root.children is None or len(root.children) == 0:
-			return None
-
-		for style in root.children:
-			search_result: Optional[Style] = self._find(id=id, root=style)
-			if search_result is not None:
-				return search_result
-		
-		return None
 	
 	def link_run_and_paragraph_styles(self) -> None:
 		"""_summary_
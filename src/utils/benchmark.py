@@ -0,0 +1,337 @@
+"""
+Hierarchization and implied index resolution benchmarks on synthetic documents,
+ and implied index detection prefilter statistics of .docx files.
+Usage (from src/, as a module, since running the file directly lets utils/pydantic.py shadow pydantic):
+	python -m utils.benchmark [file.docx ...]
+"""
+from __future__ import annotations
+from typing import Callable, Iterable, Optional
+
+import sys
+import time
+import random
+from functools import partial
+
+from abstract_docx.data_models.styles import (
+	Style, StyleProperties, RunStyleProperties, ParagraphStyleProperties, StylesView
+)
+from abstract_docx.data_models.numberings import NumberingsView, Level, ImpliedIndex
+from abstract_docx.data_models.document import Block, Paragraph, Format
+
+from abstract_docx.main import AbstractDocx
+from abstract_docx.normalization.document import EffectiveDocumentFromOoxml
+from abstract_docx.hierarchization.document import (
+	HierarchicalDocumentFromOoxml, HierarchizationConflictResolution, DEFAULT_HIERARCHIZATION_CONFLICT_RESOLUTION
+)
+
+
+def _synthetic_styles(n_priorities: int) -> list[Style]:
+	"""
+	Styles with strictly decreasing priority (style 0 has the highest priority).
+	"""
+	return [
+		Style(
+			id=f"__@BENCHMARK={i}__",
+			properties=StyleProperties(
+				run_style_properties=RunStyleProperties(), paragraph_style_properties=ParagraphStyleProperties()
+			)
+		)
+		for i in range(n_priorities)
+	]
+
+
+def synthetic_deep_document(n_blocks: int) -> tuple[list[Style], list[int]]:
+	"""
+	Deep document: each block has lower priority than the previous one (a single chain of nested blocks),
+	 closed every 'n_blocks // 2' blocks by a block with the highest priority, which climbs back the whole chain.
+	:param n_blocks: Number of blocks of the document.
+	:return: Styles (priority ordered) and the style position of each block.
+	"""
+	depth: int = max(n_blocks // 2, 1)
+	return _synthetic_styles(n_priorities=depth), [i % depth for i in range(n_blocks)]
+
+
+def synthetic_wide_document(n_blocks: int, n_priorities: int = 4) -> tuple[list[Style], list[int]]:
+	"""
+	Wide document: shallow repeating sections (heading followed by many same priority body blocks).
+	:param n_blocks: Number of blocks of the document.
+	:param n_priorities: Number of different priorities, defaults to 4.
+	:return: Styles (priority ordered) and the style position of each block.
+	"""
+	return (
+		_synthetic_styles(n_priorities=n_priorities),
+		[0 if i % 100 == 0 else min(1 + (i % 100) // 33, n_priorities - 1) for i in range(n_blocks)]
+	)
+
+
+def _hierarchical_document(styles: list[Style], block_styles: list[int]) -> tuple[HierarchicalDocumentFromOoxml, list[Block]]:
+	hierarchical_document: HierarchicalDocumentFromOoxml = HierarchicalDocumentFromOoxml.model_construct(
+		root=Block(id=-1),
+		styles_view=StylesView.load(
+			styles={style.id: style for style in styles}, priority_ordered_styles=[[style] for style in styles]
+		),
+		numberings_view=NumberingsView.load(numberings={}, enumerations={}, levels={}, priority_ordered_levels=[]),
+		hierarchization_conflict_resolution=DEFAULT_HIERARCHIZATION_CONFLICT_RESOLUTION
+	)
+	blocks: list[Block] = [
+		Paragraph(id=i, content=[], format=Format(style=styles[style_position]))
+		for i, style_position in enumerate(block_styles)
+	]
+
+	return hierarchical_document, blocks
+
+
+def _traverse_recursive(self: HierarchicalDocumentFromOoxml, curr_block: Block, prev_block: Block) -> None:
+	"""
+	Baseline recursive hierarchization step (HierarchicalDocumentFromOoxml._traverse before it was made iterative),
+	 vendored verbatim as the reference of the iterative algorithm (only the recursive call goes through this function).
+	"""
+	# TODO: implicit_index_matches
+
+	total_priority_difference: int = -1
+	if prev_block.id != -1:
+		indexes_present: bool = (
+			(curr_block.format.index is not None or curr_block.format.implied_index is not None)
+			and (prev_block.format.index is not None or prev_block.format.implied_index is not None)
+		)
+		shared_numbering: bool = (
+			indexes_present 
+			and (
+				curr_block.format.index is None or prev_block.format.index is None
+				or (
+					curr_block.format.index is not None and prev_block.format.index is not None
+					and curr_block.format.index.numbering == prev_block.format.index.numbering
+				)
+			)
+		)
+
+		styles_priority_difference: int = self.styles_view.priority_difference(
+			curr_style=curr_block.format.style, prev_style=prev_block.format.style
+		)
+		if indexes_present and styles_priority_difference == 0:
+			styles_priority_difference = self.styles_view.priority_difference(
+				curr_style=(
+					curr_block.format.index.level.style if curr_block.format.index is not None
+					else curr_block.format.implied_index.level.style
+				),
+				prev_style=(
+					prev_block.format.index.level.style if prev_block.format.index is not None
+					else prev_block.format.implied_index.level.style
+				)
+			)
+
+		if shared_numbering:
+			numberings_priority_difference: int = self.numberings_view.priority_difference(
+				curr_index=(
+					curr_block.format.index if curr_block.format.index is not None
+					else curr_block.format.implied_index
+				),
+				prev_index=(
+					prev_block.format.index if prev_block.format.index is not None
+					else prev_block.format.implied_index
+				)
+			)
+			
+			if (
+				self.hierarchization_conflict_resolution == HierarchizationConflictResolution.BOUNDED
+				and styles_priority_difference != 0 and numberings_priority_difference != 0
+				and styles_priority_difference == -numberings_priority_difference
+			):
+				raise ValueError("") # TODO
+			total_priority_difference = numberings_priority_difference				
+		else:
+			total_priority_difference = styles_priority_difference
+
+	match total_priority_difference:
+		case 0:
+			# Shared parent
+			prev_block.parent.children.append(curr_block)
+			curr_block.parent = prev_block.parent
+		case 1:
+			# Traverse with parent
+			_traverse_recursive(self, curr_block=curr_block, prev_block=prev_block.parent)
+		case -1:
+			# Child
+			if prev_block.children is None:
+				prev_block.children = [curr_block]
+			else:
+				prev_block.children.append(curr_block)
+			curr_block.parent = prev_block
+
+
+def hierarchize_recursive(hierarchical_document: HierarchicalDocumentFromOoxml, blocks: Iterable[Block]) -> None:
+	prev_block: Block = hierarchical_document.root
+	for block in blocks:
+		_traverse_recursive(hierarchical_document, curr_block=block, prev_block=prev_block)
+		prev_block: Block = block
+
+
+def _tree_signature(block: Block) -> tuple[tuple[int, Optional[int]], ...]:
+	"""
+	Preorder (block id, parent block id) pairs of the tree, computed iteratively so that deep trees can be compared.
+	"""
+	signature: list[tuple[int, Optional[int]]] = []
+	stack: list[tuple[Block, Optional[int]]] = [(block, None)]
+	while stack:
+		curr_block, parent_id = stack.pop()
+		signature.append((curr_block.id, parent_id))
+		if curr_block.children is not None:
+			stack.extend((child, curr_block.id) for child in reversed(curr_block.children))
+
+	return tuple(signature)
+
+
+def benchmark_hierarchization(
+	document: Callable[[int], tuple[list[Style], list[int]]], n_blocks: int, repeat: int = 3
+) -> dict[str, float]:
+	"""
+	Compares the recursive (reference) and iterative hierarchization algorithms on a synthetic document.
+	The recursive algorithm is reported as infinite if it exceeds the recursion limit.
+
+	:param document: Synthetic document generator.
+	:param n_blocks: Number of blocks of the synthetic document.
+	:param repeat: Number of repetitions (best time is kept), defaults to 3.
+	:return: Best wall-clock time in seconds of each algorithm.
+	:raises ValueError: If both algorithms do not produce the same tree.
+	"""
+	styles, block_styles = document(n_blocks)
+
+	results: dict[str, float] = {}
+	signatures: dict[str, tuple] = {}
+	for name in ("recursive", "iterative"):
+		best: float = float("inf")
+		for _ in range(repeat):
+			hierarchical_document, blocks = _hierarchical_document(styles=styles, block_styles=block_styles)
+			hierarchize: Callable = (
+				partial(hierarchize_recursive, hierarchical_document=hierarchical_document) if name == "recursive"
+				else hierarchical_document._hierarchize
+			)
+
+			start: float = time.perf_counter()
+			try:
+				hierarchize(blocks=blocks)
+			except RecursionError:
+				break
+			best = min(best, time.perf_counter() - start)
+
+			signatures[name] = _tree_signature(block=hierarchical_document.root)
+
+		results[name] = best
+
+	if len(signatures) == 2 and signatures["recursive"] != signatures["iterative"]:
+		raise ValueError("Recursive and iterative hierarchization trees do not match")
+
+	return results
+
+
+def synthetic_implied_index_document(
+	n_paragraphs: int, n_levels: int = 6, n_candidates: int = 3, seed: int = 0
+) -> EffectiveDocumentFromOoxml:
+	"""
+	Document whose paragraphs continue the index counter of a random level, each paragraph also has
+	 'n_candidates - 1' random implied index matches (ambiguous markers, e.g. "i." being a letter or a roman numeral).
+	:param n_paragraphs: Number of paragraphs of the document.
+	:param n_levels: Number of levels, defaults to 6.
+	:param n_candidates: Number of implied index matches per paragraph, defaults to 3.
+	:param seed: Random seed, defaults to 0.
+	:return: Effective document ready for the implied index resolution.
+	"""
+	rng: random.Random = random.Random(seed)
+	style: Style = _synthetic_styles(n_priorities=1)[0]
+	levels: list[Level] = [Level.model_construct(id=f"__@BENCHMARK_LEVEL={i}__") for i in range(n_levels)]
+
+	effective_document_from_ooxml: EffectiveDocumentFromOoxml = EffectiveDocumentFromOoxml.model_construct(
+		effective_document={}
+	)
+	effective_document_from_ooxml._effective_paragraphs_implied_index_matches_map = {}
+	counters: list[int] = [0] * n_levels
+	for i in range(n_paragraphs):
+		effective_document_from_ooxml.effective_document[i] = Paragraph(id=i, content=[], format=Format(style=style))
+
+		level_position: int = rng.randrange(n_levels)
+		counters[level_position] += 1
+		candidates: list[tuple[int, int]] = [(level_position, counters[level_position])] + [
+			(rng.randrange(n_levels), rng.randint(1, max(counters))) for _ in range(n_candidates - 1)
+		]
+		rng.shuffle(candidates)
+		effective_document_from_ooxml._effective_paragraphs_implied_index_matches_map[i] = {
+			f"{j}": ImpliedIndex.model_construct(level=levels[candidate_level], index_ctr=index_ctr, index_str=f"{index_ctr}.")
+			for j, (candidate_level, index_ctr) in enumerate(candidates)
+		}
+
+	return effective_document_from_ooxml
+
+
+def benchmark_implied_index_resolution(n_paragraphs: int, repeat: int = 3, **kwargs) -> float:
+	"""
+	Implied index resolution (see EffectiveDocumentFromOoxml._resolve_implied_indexes) on a synthetic document,
+	 its time per paragraph must stay roughly constant as the number of paragraphs grows (linear resolution).
+	:param n_paragraphs: Number of paragraphs of the synthetic document.
+	:param repeat: Number of repetitions (best time is kept), defaults to 3.
+	:param kwargs: Parameters of the synthetic document (see synthetic_implied_index_document).
+	:return: Best wall-clock time in seconds.
+	"""
+	best: float = float("inf")
+	for _ in range(repeat):
+		effective_document_from_ooxml: EffectiveDocumentFromOoxml = synthetic_implied_index_document(
+			n_paragraphs=n_paragraphs, **kwargs
+		)
+
+		start: float = time.perf_counter()
+		effective_document_from_ooxml._resolve_implied_indexes()
+		best = min(best, time.perf_counter() - start)
+
+	return best
+
+
+def benchmark_implied_index_prefilter(file_path: str) -> dict[str, float]:
+	"""
+	Implied index detection statistics of a document (see EffectiveDocumentFromOoxml.implied_index_detection_stats).
+	:param file_path: Path of the .docx file.
+	:return: Number of paragraphs checked, rejected by the prefilter, rejection rate and normalization wall-clock time in seconds.
+	"""
+	with open(file_path, "rb") as f:
+		content: bytes = f.read()
+	abstract_docx: AbstractDocx = AbstractDocx(
+		file_path=file_path, ooxml_docx=AbstractDocx._load_ooxml_docx(content=content, file_path=file_path)
+	)
+
+	start: float = time.perf_counter()
+	abstract_docx._normalize()
+	elapsed: float = time.perf_counter() - start
+
+	stats: dict[str, int] = abstract_docx._effective_structure.document.implied_index_detection_stats
+	return {
+		**stats,
+		"rejection_rate": stats["prefilter_rejections"] / stats["checks"] if stats["checks"] != 0 else 0.0,
+		"normalization": elapsed
+	}
+
+
+if __name__ == "__main__":
+	sys.setrecursionlimit(10000)
+
+	for file_path in sys.argv[1:]:
+		results: dict[str, float] = benchmark_implied_index_prefilter(file_path=file_path)
+		print(
+			f"{file_path}: {results['prefilter_rejections']}/{results['checks']} paragraphs rejected by the prefilter "
+			f"({results['rejection_rate']:.1%}), normalization={results['normalization'] * 1000:.1f}ms"
+		)
+	if len(sys.argv) > 1:
+		sys.exit(0)
+
+	for document in (synthetic_deep_document, synthetic_wide_document):
+		for n_blocks in (1000, 5000, 20000):
+			results: dict[str, float] = benchmark_hierarchization(document=document, n_blocks=n_blocks)
+			print(
+				f"{document.__name__:<24} {n_blocks:>6} blocks: "
+				+ ", ".join(f"{name}={t * 1000:.1f}ms" for name, t in results.items())
+			)
+
+	for n_levels in (2, 6):
+		for n_paragraphs in (500, 1000, 2000, 5000):
+			t: float = benchmark_implied_index_resolution(n_paragraphs=n_paragraphs, n_levels=n_levels)
+			print(
+				f"{'implied index resolution':<24} {n_paragraphs:>6} paragraphs ({n_levels} levels): "
+				f"{t * 1000:.1f}ms ({t / n_paragraphs * 1e6:.1f}us per paragraph)"
+			)